@@ -0,0 +1 @@
+"""Benchmarks for the LangChain React Agent package."""
@@ -0,0 +1,107 @@
+"""Cold-start time of the package, checked against per-stage budgets.
+
+Each stage runs in a fresh interpreter, so nothing is cached in
+sys.modules, and is timed inside the child with perf_counter. The median
+of --runs runs is reported:
+
+    package   import langchain_react_agent
+    agent     import langchain_react_agent.agent (no OPENAI_API_KEY needed)
+    build     agent.get_agent(): LLM client, graph, token budget
+    app       import the server and call create_app(): the full cold start
+
+Exits with status 1 when a stage is over its budget, so it can guard
+against a heavy import creeping back in at module level.
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --budget agent=1500 --output import.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+# Budgets in milliseconds, with headroom for slower machines
+BUDGETS = {"package": 100, "agent": 2000, "build": 4000, "app": 5000}
+
+STAGES = {
+    "package": ("", "import langchain_react_agent"),
+    "agent": ("", "import langchain_react_agent.agent"),
+    "build": ("from langchain_react_agent.agent import get_agent", "get_agent()"),
+    "app": ("", "from langchain_react_agent.server import create_app; create_app()"),
+}
+
+CHILD = """
+import time
+{setup}
+start = time.perf_counter()
+{stmt}
+print(time.perf_counter() - start)
+"""
+
+
+def child_env(stage: str) -> Dict[str, str]:
+    env = dict(os.environ, AGENT_CHECKPOINT_DB="", LOG_LEVEL="WARNING")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    if stage in ("package", "agent"):
+        # Importing must not need the API key
+        env.pop("OPENAI_API_KEY", None)
+    else:
+        env.setdefault("OPENAI_API_KEY", "benchmark")
+    return env
+
+
+def measure(stage: str, runs: int) -> List[float]:
+    setup, stmt = STAGES[stage]
+    times = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD.format(setup=setup, stmt=stmt)],
+            env=child_env(stage), capture_output=True, text=True, check=True,
+        )
+        times.append(float(result.stdout.strip().splitlines()[-1]) * 1e3)
+    return times
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold-start import time against budgets.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per stage")
+    parser.add_argument("--budget", action="append", default=[], metavar="STAGE=MS",
+                        help="override a stage budget, e.g. agent=1500")
+    parser.add_argument("--output", "-o", help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    budgets = dict(BUDGETS)
+    for override in args.budget:
+        stage, _, ms = override.partition("=")
+        if stage not in STAGES:
+            parser.error(f"unknown stage {stage!r}; stages are {', '.join(STAGES)}")
+        budgets[stage] = float(ms)
+
+    results = []
+    for stage in STAGES:
+        times = measure(stage, args.runs)
+        median = statistics.median(times)
+        results.append({
+            "name": f"import.{stage}",
+            "median_ms": round(median, 1),
+            "min_ms": round(min(times), 1),
+            "budget_ms": budgets[stage],
+            "over_budget": median > budgets[stage],
+        })
+
+    for result in results:
+        flag = "  OVER BUDGET" if result["over_budget"] else ""
+        print(f"{result['name']:<16} median {result['median_ms']:>8.1f} ms  "
+              f"min {result['min_ms']:>8.1f} ms  budget {result['budget_ms']:>6.0f} ms{flag}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump({"results": results}, handle, indent=2)
+    return 1 if any(result["over_budget"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""Latency of the country_data operations against registry size.
+
+Compares the indexed PortRegistry with the previous linear scans over the
+entries list (rank is the ranked, typo-tolerant search, shown against the
+old unranked substring scan). Indexed latency should stay flat as the registry grows.
+
+    python -m benchmarks.bench_port_registry
+"""
+
+import random
+
+from benchmarks.helpers import per_call_us
+from benchmarks.synthetic import make_entries
+from langchain_react_agent.port_registry import PortRegistry
+
+SIZES = [1_000, 10_000, 100_000]
+REPEAT = 200
+
+
+def linear_get(entries, entry_id):
+    return next((e for e in entries if e.id == entry_id), None)
+
+
+def linear_search(entries, query):
+    return [
+        e for e in entries
+        if query.lower() in e.name.lower() or query.lower() in e.country.lower()
+    ]
+
+
+def main():
+    print(f"{'size':>8} {'operation':<14} {'linear us':>12} {'indexed us':>12}")
+    for size in SIZES:
+        entries = make_entries(size)
+        registry = PortRegistry(entries)
+        rng = random.Random(size)
+        a, b = rng.choice(entries), rng.choice(entries)
+        query = a.name[1:5].lower()
+
+        rows = [
+            ("get_entry", lambda: linear_get(entries, a.id), lambda: registry.get(a.id)),
+            (
+                "same_country",
+                lambda: linear_get(entries, a.id).country == linear_get(entries, b.id).country,
+                lambda: registry.same_country(a.id, b.id),
+            ),
+            ("search", lambda: linear_search(entries, query), lambda: registry.search(query)),
+            ("rank", lambda: linear_search(entries, query), lambda: registry.rank(query, 10)),
+        ]
+        for operation, linear, indexed in rows:
+            print(f"{size:>8} {operation:<14} {per_call_us(linear, REPEAT):>12.1f} {per_call_us(indexed, REPEAT):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Startup, memory and lookup latency of the snapshot store vs PortRegistry.
+
+Startup is loading the port CSV and building the in-memory registry, against
+opening a snapshot written from the same CSV. Memory is the Python heap each
+one allocates (tracemalloc); the snapshot's pages live in the shared page
+cache instead, so the file size is listed separately.
+
+    python -m benchmarks.bench_port_store
+"""
+
+import csv
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.helpers import per_call_us
+from benchmarks.synthetic import make_entries
+from langchain_react_agent.country_data import CountryEntry, load_entries
+from langchain_react_agent.port_registry import PortRegistry
+from langchain_react_agent.port_store import PortSnapshot, write_snapshot
+
+SIZES = [10_000, 100_000]
+REPEAT = 200
+
+
+def measure(build):
+    """Seconds and heap bytes to build an object, which is returned too."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - start
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, elapsed, heap
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'size':>8} {'':<10} {'startup ms':>11} {'heap MB':>9} {'file MB':>9} "
+              f"{'get us':>8} {'same us':>8} {'rank us':>8}")
+        for size in SIZES:
+            csv_path = os.path.join(tmp, f"ports-{size}.csv")
+            snapshot_path = os.path.join(tmp, f"ports-{size}.snapshot")
+            entries = make_entries(size)
+            with open(csv_path, "w", newline="", encoding="utf-8") as handle:
+                writer = csv.writer(handle)
+                writer.writerow(["id", "name", "country"])
+                writer.writerows((e.id, e.name, e.country) for e in entries)
+            write_snapshot(entries, snapshot_path)
+            del entries
+
+            rng = random.Random(size)
+            for label, build, file_size in (
+                ("registry", lambda: PortRegistry(load_entries(csv_path)), os.path.getsize(csv_path)),
+                ("snapshot", lambda: PortSnapshot(snapshot_path, CountryEntry), os.path.getsize(snapshot_path)),
+            ):
+                registry, elapsed, heap = measure(build)
+                a = registry.get(f"{'AA'}-{rng.randrange(size):06d}") or next(iter(registry))
+                b = next(iter(registry))
+                query = a.name[1:5].lower()
+                print(
+                    f"{size:>8} {label:<10} {elapsed * 1e3:>11.1f} {heap / 2**20:>9.1f} {file_size / 2**20:>9.1f} "
+                    f"{per_call_us(lambda: registry.get(a.id), REPEAT):>8.2f} "
+                    f"{per_call_us(lambda: registry.same_country(a.id, b.id), REPEAT):>8.2f} "
+                    f"{per_call_us(lambda: registry.rank(query, 10), REPEAT):>8.1f}"
+                )
+                del registry
+
+
+if __name__ == "__main__":
+    main()
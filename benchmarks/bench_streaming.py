@@ -0,0 +1,104 @@
+"""Time to first byte of /agent/invoke against the /agent/progress stream.
+
+Serves the server app with uvicorn, and a stub OpenAI API that streams
+like the real one. For a new question the stub waits --first-token-ms,
+then sends two tool calls. After the tool results it streams an answer
+of --answer-tokens tokens, --token-ms apart. Each request is timed from
+send to the first response byte. For the progress stream, the first
+tool event, the first answer token and the end event are timed as well.
+
+    python -m benchmarks.bench_streaming
+    python -m benchmarks.bench_streaming --first-token-ms 800 --runs 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Dict, List
+
+from benchmarks.helpers import free_port, serve, stub_llm
+
+LLM_PORT = free_port()
+APP_PORT = free_port()
+# The agent reads its settings when it is built: a stub LLM, no thread store
+# and no fast path, so every run goes through the model and the tools
+os.environ["OPENAI_API_KEY"] = "benchmark"
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{LLM_PORT}/v1"
+os.environ["AGENT_CHECKPOINT_DB"] = ""
+os.environ["AGENT_FAST_PATH"] = "0"
+os.environ["AGENT_LLM_MODE"] = "live"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+
+ORIGIN, DESTINATION = "DE-HAM", "US-NYC"
+QUESTION = {"messages": [{"content": f"Book 2 HH42 from {ORIGIN} to {DESTINATION}", "type": "human"}]}
+
+
+async def time_invoke(client: httpx.AsyncClient) -> Dict[str, float]:
+    times: Dict[str, float] = {}
+    start = time.perf_counter()
+    async with client.stream("POST", "/agent/invoke", json={"input": QUESTION}) as response:
+        async for _ in response.aiter_raw():
+            times.setdefault("ttfb", time.perf_counter() - start)
+    times["total"] = time.perf_counter() - start
+    return times
+
+
+async def time_progress(client: httpx.AsyncClient) -> Dict[str, float]:
+    times: Dict[str, float] = {}
+    start = time.perf_counter()
+    async with client.stream("POST", "/agent/progress", json={"input": QUESTION}) as response:
+        async for line in response.aiter_lines():
+            elapsed = time.perf_counter() - start
+            times.setdefault("ttfb", elapsed)
+            if line.startswith("event: "):
+                event = line[len("event: "):].strip()
+                times.setdefault({"tool_start": "first_tool", "token": "first_token"}.get(event, event), elapsed)
+    times["total"] = time.perf_counter() - start
+    return times
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare time to first byte of invoke and the progress stream.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-token-ms", type=float, default=400.0, help="stub LLM latency to the first token")
+    parser.add_argument("--token-ms", type=float, default=30.0, help="stub LLM delay between answer tokens")
+    parser.add_argument("--answer-tokens", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    llm = stub_llm(LLM_PORT, [ORIGIN, DESTINATION], args.first_token_ms / 1e3, args.token_ms / 1e3, args.answer_tokens)
+    from langchain_react_agent.server import create_app
+
+    server = serve(create_app(), APP_PORT)
+
+    async def run():
+        results: Dict[str, List[Dict[str, float]]] = {"invoke": [], "progress": []}
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", timeout=60) as client:
+            await time_invoke(client)
+            await time_progress(client)
+            for _ in range(args.runs):
+                results["invoke"].append(await time_invoke(client))
+                results["progress"].append(await time_progress(client))
+        return results
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        server.should_exit = llm.should_exit = True
+
+    print(f"median of {args.runs} runs, ms (stub LLM: {args.first_token_ms:.0f} ms to first token, "
+          f"{args.answer_tokens} answer tokens {args.token_ms:.0f} ms apart)")
+    for endpoint, runs in results.items():
+        fields = [name for name in ("ttfb", "metadata", "first_tool", "tool_end", "first_token", "end", "total")
+                  if all(name in run for run in runs)]
+        print(f"{endpoint:<10} " + "  ".join(
+            f"{name} {statistics.median(run[name] for run in runs) * 1e3:7.1f}" for name in fields
+        ))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
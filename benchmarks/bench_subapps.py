@@ -0,0 +1,88 @@
+"""Server-side throughput of the country and container sub-app endpoints.
+
+Calls the ASGI apps directly with prebuilt scopes and request bodies, with
+no HTTP client or socket in between, so the numbers show what the
+endpoints themselves cost: body parsing, validation, the lookup and JSON
+encoding of the response. benchmarks.suite measures the same endpoints
+end to end through an HTTP client.
+
+    python -m benchmarks.bench_subapps
+"""
+
+import asyncio
+import json
+import time
+
+from benchmarks.synthetic import make_entries
+from langchain_react_agent import country_data
+from langchain_react_agent.container_data import app as container_data_app
+from langchain_react_agent.country_data import app as country_data_app
+from langchain_react_agent.port_registry import PortRegistry
+
+REQUESTS = 20000
+REGISTRY_SIZE = 10_000
+
+
+async def call(app, path: str, body: bytes) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "server": ("bench", 80), "client": ("127.0.0.1", 1),
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = 0
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run_case(app, path: str, payload, requests: int):
+    body = json.dumps(payload).encode()
+    for _ in range(200):
+        await call(app, path, body)
+    start = time.perf_counter()
+    statuses = set()
+    for _ in range(requests):
+        statuses.add(await call(app, path, body))
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, elapsed / requests * 1e6, statuses
+
+
+def main():
+    entries = make_entries(REGISTRY_SIZE)
+    country_data.registry = PortRegistry(entries)
+    a, b = entries[1].id, entries[2].id
+    cases = [
+        ("country-data get_entry", country_data_app, "/country-data",
+         {"operation": "get_entry", "entry_id": a}),
+        ("country-data same_country", country_data_app, "/country-data",
+         {"operation": "same_country", "entry1_id": a, "entry2_id": b}),
+        ("country-data batch (3)", country_data_app, "/country-data/batch",
+         {"requests": [{"operation": "get_entry", "entry_id": a}, {"operation": "get_entry", "entry_id": b},
+                       {"operation": "same_country", "entry1_id": a, "entry2_id": b}]}),
+        ("country-data invalid", country_data_app, "/country-data",
+         {"operation": "get_entry"}),
+        ("container-check", container_data_app, "/container-check",
+         {"containers": [{"type": "HH42", "count": 2}, {"type": "HH12", "count": 1}]}),
+    ]
+
+    async def run():
+        print(f"{'endpoint':<28} {'req/s':>9} {'us/req':>8}  status")
+        for name, app, path, payload in cases:
+            rps, us, statuses = await run_case(app, path, payload, REQUESTS)
+            print(f"{name:<28} {rps:>9.0f} {us:>8.1f}  {','.join(map(str, sorted(statuses)))}")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
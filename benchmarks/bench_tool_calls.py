@@ -0,0 +1,132 @@
+"""Per-step wall time of agent steps with several independent tool calls.
+
+Serves the country and container sub-apps over HTTP with simulated network
+latency and runs model steps with 1, 3 and 6 tool calls through the agent's
+ToolNode, async (as the server does) and sync. "sequential" awaits the same
+calls one after another. With concurrent execution a step costs about one
+round trip instead of one per call, until max_concurrency is reached.
+
+    python -m benchmarks.bench_tool_calls
+"""
+
+import asyncio
+import os
+import statistics
+import time
+
+from fastapi import FastAPI, Request
+
+from benchmarks.helpers import free_port, serve
+
+LATENCY_S = 0.02
+REPEAT = 20
+
+PORT = free_port()
+# The agent reads its transport settings at import time
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ["API_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ["TOOL_DISPATCH"] = "http"
+os.environ["TOOL_CACHE_SIZE"] = "0"
+os.environ["AGENT_CHECKPOINT_DB"] = ""
+
+from langchain_core.messages import AIMessage  # noqa: E402
+from langgraph.graph import END, START, MessagesState, StateGraph  # noqa: E402
+from langgraph.prebuilt import ToolNode  # noqa: E402
+
+from langchain_react_agent import agent  # noqa: E402
+from langchain_react_agent.container_data import app as container_data_app  # noqa: E402
+from langchain_react_agent.country_data import app as country_data_app  # noqa: E402
+
+
+def serve_subapps():
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def network_latency(request: Request, call_next):
+        await asyncio.sleep(LATENCY_S)
+        return await call_next(request)
+
+    app.mount("/api/country", country_data_app)
+    app.mount("/api/container", container_data_app)
+    return serve(app, PORT)
+
+
+def tool_step():
+    """One agent tool step: the ToolNode that create_react_agent builds, on its own."""
+    builder = StateGraph(MessagesState)
+    builder.add_node("tools", ToolNode(agent.tools))
+    builder.add_edge(START, "tools")
+    builder.add_edge("tools", END)
+    return builder.compile()
+
+
+def tool_calls(count: int):
+    ports = ["DE-HAM", "US-NYC", "CN-SHA", "NL-RTM", "SG-SIN"]
+    calls = [{
+        "name": "container_check",
+        "args": {"containers": [{"type": "HH42", "count": 2}]},
+        "id": "call-0",
+    }]
+    for i in range(1, count):
+        calls.append({
+            "name": "country_data",
+            "args": {"operations": [{"operation": "get_entry", "entry_id": ports[i % len(ports)]}]},
+            "id": f"call-{i}",
+        })
+    return calls[:count]
+
+
+def median_ms(samples) -> float:
+    return statistics.median(samples) * 1e3
+
+
+async def time_async(fn) -> float:
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return median_ms(samples)
+
+
+def time_sync(fn) -> float:
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return median_ms(samples)
+
+
+async def run_async(step):
+    tools = {tool.name: tool for tool in agent.tools}
+    print(f"{'calls':>5} {'sequential ms':>14} {'async step ms':>14} {'sync step ms':>13}")
+    for count in (1, 3, 6):
+        calls = tool_calls(count)
+        state = {"messages": [AIMessage(content="", tool_calls=calls)]}
+
+        async def sequential():
+            for call in calls:
+                await tools[call["name"]].ainvoke(call["args"])
+
+        async def concurrent():
+            result = await step.ainvoke(state)
+            # Results come back in tool-call order
+            assert [m.tool_call_id for m in result["messages"][1:]] == [c["id"] for c in calls]
+
+        sync_ms = await asyncio.to_thread(time_sync, lambda: step.invoke(state))
+        print(f"{count:>5} {await time_async(sequential):>14.1f} {await time_async(concurrent):>14.1f} {sync_ms:>13.1f}")
+
+
+def main():
+    server = serve_subapps()
+    print(f"simulated latency {LATENCY_S * 1e3:.0f} ms per request, "
+          f"max_concurrency {agent.dispatcher.max_concurrency}")
+    try:
+        asyncio.run(run_async(tool_step()))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
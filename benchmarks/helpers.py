@@ -0,0 +1,110 @@
+"""Shared pieces of the benchmarks: ports, timing, servers and a stub LLM.
+
+Nothing here imports langchain_react_agent, so a benchmark can pick its
+ports and set the agent's environment before the agent is imported.
+"""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+import timeit
+from typing import Any, Callable, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def per_call_us(fn: Callable[[], Any], number: int, repeat: int = 5) -> float:
+    """Best of `repeat` runs of `number` calls, in microseconds per call."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def serve(app, port: int) -> uvicorn.Server:
+    """Run `app` with uvicorn on a background thread; returns once it accepts connections."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def booking_tool_calls(ports: List[str]) -> List[Dict]:
+    """The calls a model makes to check a booking of 2 HH42 between two ports."""
+    return [
+        {"id": "call-0", "type": "function", "function": {
+            "name": "container_check",
+            "arguments": json.dumps({"containers": [{"type": "HH42", "count": 2}]}),
+        }},
+        {"id": "call-1", "type": "function", "function": {
+            "name": "country_data",
+            "arguments": json.dumps({"operations": [
+                {"operation": "get_entry", "entry_id": ports[0]},
+                {"operation": "get_entry", "entry_id": ports[1]},
+                {"operation": "same_country", "entry1_id": ports[0], "entry2_id": ports[1]},
+            ]}),
+        }},
+    ]
+
+
+def _chunk(model: str, delta: Dict, finish_reason=None) -> str:
+    body = {
+        "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(body)}\n\n"
+
+
+def stub_llm(port: int, ports: List[str], first_token_s: float, token_s: float = 0.0,
+             answer_tokens: int = 5) -> uvicorn.Server:
+    """OpenAI-compatible chat endpoint, streamed or not: tool calls for a new question, then an answer.
+
+    A new question waits `first_token_s` and gets booking_tool_calls(ports).
+    After the tool results the answer has `answer_tokens` tokens, streamed
+    `token_s` apart; unstreamed answers take as long in total.
+    """
+    app = FastAPI()
+    answer = ["The", " booking", " is", " valid", "."] + [" Confirmed"] * max(answer_tokens - 5, 0)
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        model = body["model"]
+        answering = body["messages"][-1]["role"] == "tool"
+
+        async def stream():
+            await asyncio.sleep(first_token_s)
+            if not answering:
+                calls = [{"index": i, **call} for i, call in enumerate(booking_tool_calls(ports))]
+                yield _chunk(model, {"role": "assistant", "content": None, "tool_calls": calls})
+                yield _chunk(model, {}, "tool_calls")
+            else:
+                for i, token in enumerate(answer):
+                    if i:
+                        await asyncio.sleep(token_s)
+                    yield _chunk(model, {"role": "assistant", "content": token} if not i else {"content": token})
+                yield _chunk(model, {}, "stop")
+            yield "data: [DONE]\n\n"
+
+        if body.get("stream"):
+            return StreamingResponse(stream(), media_type="text/event-stream")
+        await asyncio.sleep(first_token_s + (token_s * (len(answer) - 1) if answering else 0))
+        if answering:
+            message = {"role": "assistant", "content": "".join(answer)}
+        else:
+            message = {"role": "assistant", "content": None, "tool_calls": booking_tool_calls(ports)}
+        return {
+            "id": "stub", "object": "chat.completion", "created": 0, "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 500, "completion_tokens": 20, "total_tokens": 520},
+        }
+
+    return serve(app, port)
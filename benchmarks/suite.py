@@ -0,0 +1,224 @@
+"""Benchmark suite with machine-readable results for regression checks.
+
+Micro-benchmarks time the country_data operations (parse, execute and JSON
+encoding, as the endpoint does) against registries of growing size, and the
+container check. The ASGI benchmarks drive the server app in-process with
+concurrent clients and report throughput and p50/p99 latency for the two
+sub-app endpoints and for /agent/invoke. The agent talks to a stub OpenAI
+API served on localhost, which asks for two tool calls and then answers
+after a fixed latency, so the full agent and tool pipeline is exercised.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --quick --compare results.json
+
+--compare exits with status 1 when a result is worse than the baseline by
+more than --tolerance (a fraction; default 0.3). Compare runs from the same
+machine; shared or busy hosts easily vary by 20%.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks.helpers import free_port, per_call_us, stub_llm
+
+LLM_PORT = free_port()
+# The agent reads its settings at import time: a stub LLM, no thread store and
+# no fast path, so every /agent run goes through the model and the tools
+os.environ["OPENAI_API_KEY"] = "benchmark"
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{LLM_PORT}/v1"
+os.environ["AGENT_CHECKPOINT_DB"] = ""
+os.environ["AGENT_FAST_PATH"] = "0"
+os.environ["AGENT_LLM_MODE"] = "live"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from benchmarks.synthetic import make_entries  # noqa: E402
+from langchain_react_agent import country_data  # noqa: E402
+from langchain_react_agent.container_data import ContainerRequest, check_containers  # noqa: E402
+from langchain_react_agent.port_registry import PortRegistry  # noqa: E402
+
+# Better direction of each compared field
+COMPARED = {"us_per_call": "lower", "rps": "higher", "p50_ms": "lower", "p99_ms": "lower"}
+
+
+def micro_benchmarks(sizes: List[int]) -> List[Dict[str, Any]]:
+    results = []
+
+    def handler(payload):
+        return lambda: jsonable_encoder(country_data.execute(country_data.parse_request(payload)))
+
+    for size in sizes:
+        entries = make_entries(size)
+        country_data.registry = PortRegistry(entries)
+        a, b = entries[size // 3], entries[2 * size // 3]
+        cases = {
+            "get_entry": {"operation": "get_entry", "entry_id": a.id},
+            "same_country": {"operation": "same_country", "entry1_id": a.id, "entry2_id": b.id},
+            "search": {"operation": "search", "search_query": a.name[1:5].lower()},
+        }
+        for operation, payload in cases.items():
+            number = 50 if operation == "search" else 2000
+            results.append({
+                "name": f"micro.country_data.{operation}[{size}]",
+                "kind": "micro",
+                "registry_size": size,
+                "us_per_call": round(per_call_us(handler(payload), number), 3),
+            })
+
+    container_payload = {"containers": [{"type": "HH42", "count": 2}, {"type": "HH12", "count": 1}]}
+    results.append({
+        "name": "micro.container_check",
+        "kind": "micro",
+        "us_per_call": round(per_call_us(
+            lambda: jsonable_encoder(check_containers(ContainerRequest.model_validate(container_payload))), 2000
+        ), 3),
+    })
+    return results
+
+
+async def load(app, method: str, path: str, payload: Any, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Closed-loop load: `concurrency` clients send `requests` requests in total."""
+    transport = httpx.ASGITransport(app=app)
+    latencies: List[float] = []
+    errors = 0
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for _ in range(min(concurrency, 5)):
+            await client.request(method, path, json=payload)
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                response = await client.request(method, path, json=payload)
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code >= 400
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1e3, 2),
+        "p99_ms": round(latencies[min(int(0.99 * len(latencies)), len(latencies) - 1)] * 1e3, 2),
+    }
+
+
+def asgi_benchmarks(registry_size: int, requests: int, agent_requests: int, llm_latency_s: float) -> List[Dict[str, Any]]:
+    entries = make_entries(registry_size)
+    country_data.registry = PortRegistry(entries)
+    # Ports in different countries, so the stubbed booking is valid
+    ports = [entries[0].id, entries[1].id]
+    server = stub_llm(LLM_PORT, ports, llm_latency_s)
+    from langchain_react_agent.server import app
+
+    cases = [
+        ("asgi.country_data.get_entry", "/api/country/country-data",
+         {"operation": "get_entry", "entry_id": ports[0]}, requests, 32),
+        ("asgi.country_data.search", "/api/country/country-data",
+         {"operation": "search", "search_query": entries[0].name[1:5].lower()}, requests, 32),
+        ("asgi.container_check", "/api/container/container-check",
+         {"containers": [{"type": "HH42", "count": 2}]}, requests, 32),
+        ("asgi.agent.invoke", "/agent/invoke",
+         {"input": {"messages": [{"content": f"Book 2 HH42 from {ports[0]} to {ports[1]}", "type": "human"}]}},
+         agent_requests, 8),
+    ]
+
+    async def run_cases():
+        results = []
+        for name, path, payload, count, concurrency in cases:
+            stats = await load(app, "POST", path, payload, count, concurrency)
+            results.append({"name": name, "kind": "asgi", "registry_size": registry_size, **stats})
+        return results
+
+    try:
+        results = asyncio.run(run_cases())
+    finally:
+        server.should_exit = True
+    results[-1]["llm_latency_ms"] = llm_latency_s * 1e3
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Descriptions of the fields that got worse than the baseline by more than `tolerance`."""
+    before = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = before.get(result["name"])
+        if old is None:
+            continue
+        for field, better in COMPARED.items():
+            if field not in result or not old.get(field):
+                continue
+            change = (result[field] - old[field]) / old[field]
+            worse = change > tolerance if better == "lower" else change < -tolerance
+            if worse:
+                regressions.append(f"{result['name']} {field}: {old[field]} -> {result[field]} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--output", "-o", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown as a fraction")
+    parser.add_argument("--quick", action="store_true", help="smaller registries and fewer requests")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="latency of the stub LLM")
+    args = parser.parse_args(argv)
+
+    sizes = [1_000, 10_000] if args.quick else [1_000, 10_000, 100_000]
+    requests, agent_requests = (500, 40) if args.quick else (3000, 200)
+
+    results = micro_benchmarks(sizes)
+    results += asgi_benchmarks(10_000, requests, agent_requests, args.llm_latency_ms / 1e3)
+    report = {"environment": environment(), "results": results}
+
+    for result in results:
+        values = {k: v for k, v in result.items() if k in COMPARED or k == "errors"}
+        print(f"{result['name']:<42} " + " ".join(f"{k}={v}" for k, v in values.items()))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+"""Synthetic port data for benchmarks."""
+
+import random
+import string
+from typing import List
+
+from langchain_react_agent.country_data import CountryEntry
+
+COUNTRIES = [f"Country {code}" for code in ("AA", "BB", "CC", "DD", "EE", "FF", "GG", "HH")]
+
+
+def make_entries(size: int, seed: int = 42) -> List[CountryEntry]:
+    """Build `size` UN/LOCODE-shaped entries with pseudo-random names."""
+    rng = random.Random(seed)
+    entries = []
+    for i in range(size):
+        country = COUNTRIES[i % len(COUNTRIES)]
+        name = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12))).title()
+        entries.append(CountryEntry(id=f"{country[-2:]}-{i:06d}", name=name, country=country))
+    return entries
@@ -2,10 +2,25 @@
 LangChain React Agent package.
 """
 
-from .agent import byo_chatgpt
-from .server import app
-from .country_data import app as country_data_app
-from .container_data import app as container_data_app
-
 __version__ = "1.0.0"
-__all__ = ["byo_chatgpt", "app", "country_data_app", "container_data_app"]
+__all__ = ["byo_chatgpt", "get_agent", "app", "create_app", "country_data_app", "container_data_app"]
+
+_EXPORTS = {
+    "byo_chatgpt": ("agent", "byo_chatgpt"),
+    "get_agent": ("agent", "get_agent"),
+    "app": ("server", "app"),
+    "create_app": ("server", "create_app"),
+    "country_data_app": ("country_data", "app"),
+    "container_data_app": ("container_data", "app"),
+}
+
+
+def __getattr__(name):
+    # Imported on first use, so tools such as validate_bookings.py can use the
+    # validation modules without configuring (or importing) the agent
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    module, attribute = _EXPORTS[name]
+    return getattr(import_module(f"{__name__}.{module}"), attribute)
@@ -0,0 +1,247 @@
+"""Admission control for the LLM-bound agent routes.
+
+At most `max_in_flight` agent runs execute at once. Further requests wait
+in a bounded queue for up to `queue_timeout` seconds. The queue is kept per
+client, and freed slots go to the waiting clients in turn, so one client
+sending a burst cannot starve the others. Requests that cannot be queued
+are rejected straight away: 429 when the client already has its share of
+the queue waiting, 503 when the whole queue is full or the wait timed out.
+Both carry a Retry-After estimated from recent run times.
+
+UpstreamRetry is the other half: jittered backoff for when the LLM API
+itself answers 429.
+"""
+
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Optional
+import asyncio
+import math
+import random
+import time
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# langserve endpoints that start an agent run, and the progress stream
+RUN_ENDPOINTS = ("invoke", "batch", "stream", "stream_log", "stream_events", "progress")
+
+
+class AdmissionRejected(Exception):
+    """A request that was not admitted; carries the HTTP status and Retry-After."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded, per-client fair wait queue.
+
+    Not thread-safe: use it from the event loop that serves the requests.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue: int,
+        queue_timeout: float,
+        max_queue_per_client: Optional[int] = None,
+        history_size: int = 1024,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_queue_per_client = max_queue_per_client or max_queue
+        self.in_flight = 0
+        self.queued = 0
+        # Waiters per client; the first client in the dict is served next
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._waits: Deque[float] = deque(maxlen=history_size)
+        # Moving average of run time, for the Retry-After estimate
+        self._service_time = 1.0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"client_queue_full": 0, "queue_full": 0, "queue_timeout": 0}
+
+    def retry_after(self) -> int:
+        """Seconds until a new request would likely get a slot."""
+        rounds = (self.queued + 1) / max(self.max_in_flight, 1)
+        return max(1, math.ceil(rounds * self._service_time))
+
+    def _reject(self, status_code: int, reason: str) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        return AdmissionRejected(status_code, reason, self.retry_after())
+
+    async def acquire(self, client: str) -> None:
+        """Wait for a slot; raises AdmissionRejected instead of waiting too long."""
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            self.admitted += 1
+            self._waits.append(0.0)
+            return
+
+        waiters = self._queues.get(client)
+        if waiters is not None and len(waiters) >= self.max_queue_per_client:
+            raise self._reject(429, "client_queue_full")
+        if self.queued >= self.max_queue:
+            raise self._reject(503, "queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(client, deque()).append(waiter)
+        self.queued += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up on it
+                self.release()
+            else:
+                self._discard(client, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(503, "queue_timeout") from None
+            raise
+        # release() already counted the slot as in flight for us
+        self.admitted += 1
+        self._waits.append(time.monotonic() - start)
+
+    def release(self, service_time: Optional[float] = None) -> None:
+        """Free a slot, handing it to the next client in turn if any are waiting."""
+        if service_time is not None:
+            self._service_time = 0.9 * self._service_time + 0.1 * service_time
+        while self._queues:
+            client, waiters = next(iter(self._queues.items()))
+            waiter = waiters.popleft()
+            self.queued -= 1
+            if waiters:
+                # Served one of this client's requests; go to the back of the line
+                self._queues.move_to_end(client)
+            else:
+                del self._queues[client]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _discard(self, client: str, waiter: asyncio.Future) -> None:
+        waiters = self._queues.get(client)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        self.queued -= 1
+        if not waiters:
+            del self._queues[client]
+
+    @asynccontextmanager
+    async def slot(self, client: str) -> AsyncIterator[None]:
+        await self.acquire(client)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            return round(waits[min(int(p * len(waits)), len(waits) - 1)] * 1000, 1) if waits else 0.0
+
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "max_queue": self.max_queue,
+            "max_queue_per_client": self.max_queue_per_client,
+            "queue_depth": self.queued,
+            "clients_waiting": len(self._queues),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "wait_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(waits[-1] * 1000, 1) if waits else 0.0,
+            },
+            "avg_run_seconds": round(self._service_time, 3),
+        }
+
+
+class AdmissionMiddleware:
+    """Runs the agent endpoints under `prefix` through an AdmissionController.
+
+    The slot is held until the response has been sent, so streamed runs
+    count for as long as they stream. Clients are told apart by the
+    X-Client-Id header, falling back to the client address.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController, prefix: str = "/agent",
+                 endpoints: Iterable[str] = RUN_ENDPOINTS):
+        self.app = app
+        self.controller = controller
+        self.prefix = prefix.rstrip("/") + "/"
+        self.endpoints = frozenset(endpoints)
+
+    def _is_run(self, scope: Scope) -> bool:
+        path = scope["path"]
+        return (
+            scope["method"] == "POST"
+            and path.startswith(self.prefix)
+            and path.rsplit("/", 1)[-1] in self.endpoints
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._is_run(scope):
+            await self.app(scope, receive, send)
+            return
+        client = _client_id(scope)
+        try:
+            async with self.controller.slot(client):
+                await self.app(scope, receive, send)
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                {"detail": "Server is busy, retry later", "reason": e.reason},
+                status_code=e.status_code,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+
+
+def _client_id(scope: Scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"x-client-id":
+            return value.decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 20.0,
+                  retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+class UpstreamRetry:
+    """Retry budget and backoff for rate-limited or failing upstream calls."""
+
+    def __init__(self, max_retries: int = 4, base: float = 0.5, cap: float = 20.0):
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self.retries = 0
+        self.exhausted = 0
+
+    def next_delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait before retry number `attempt` + 1, or None to give up."""
+        if attempt >= self.max_retries:
+            self.exhausted += 1
+            return None
+        self.retries += 1
+        return backoff_delay(attempt, self.base, self.cap, retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"max_retries": self.max_retries, "retries": self.retries, "exhausted": self.exhausted}
@@ -1,132 +1,263 @@
-from langchain_community.tools.google_serper import GoogleSerperRun
-from langchain_community.utilities.google_serper import GoogleSerperAPIWrapper
-from langchain_experimental.utilities import PythonREPL
-from langgraph.prebuilt import create_react_agent
-from langchain_core.tools import tool, Tool, BaseTool
-from langchain_openai import ChatOpenAI
-from openai import OpenAI
-from langchain_react_agent.country_data import Operation, CountryDataRequest, SameCountryRequest, GetEntryRequest, SearchRequest
-from langchain_react_agent.container_data import ContainerType, ContainerRequest
+from langchain_core.tools import BaseTool
+from langchain_core.messages import AIMessage, SystemMessage
+from langchain_react_agent.country_data import TypedRequest, registry as port_registry
+from langchain_react_agent.container_data import ContainerCount, ContainerRequest
+from langchain_react_agent.dispatch import DispatchError, ToolDispatcher
+from langchain_react_agent.cache import ToolResultCache
+from langchain_react_agent.singleflight import AsyncSingleFlight, SingleFlight
+from langchain_react_agent import fast_path
+from langchain_react_agent.admission import UpstreamRetry
+from langchain_react_agent.tracing import span
+from langgraph.constants import END
+import functools
+import httpx
 import requests
 import os
-import time
-import random
-from pydantic import BaseModel, Field, RootModel
-from typing import Optional, Dict, Any, Type, List, Union, Literal
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, Dict, Any, Type, List, Union, Literal, NamedTuple
 from dotenv import load_dotenv
 import json
+import logging
 from urllib.parse import urljoin
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables with override
 load_dotenv(override=True)
 
-# Initialize environment variables
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY environment variable is not set")
+# LLM backend: live (default), record (live, saving every exchange to the
+# cassette) or replay (answers from the cassette only, no API key needed)
+AGENT_LLM_MODE = os.getenv("AGENT_LLM_MODE", "live")
+AGENT_LLM_CASSETTE = os.getenv("AGENT_LLM_CASSETTE", "llm_cassette.ndjson")
+# Simulated latency of replayed calls: "recorded" or milliseconds
+AGENT_LLM_REPLAY_LATENCY = os.getenv("AGENT_LLM_REPLAY_LATENCY", "recorded")
 
 # Get the base URL for the API - use environment variable or default to relative path
 API_BASE_URL = os.getenv('API_BASE_URL', '')
 if not API_BASE_URL:
     # In cloud environment, use relative paths
     COUNTRY_DATA_ENDPOINT = '/api/country/country-data'
+    COUNTRY_DATA_BATCH_ENDPOINT = '/api/country/country-data/batch'
     CONTAINER_CHECK_ENDPOINT = '/api/container/container-check'
 else:
     # In local environment, use full URLs
     COUNTRY_DATA_ENDPOINT = urljoin(API_BASE_URL, '/api/country/country-data')
+    COUNTRY_DATA_BATCH_ENDPOINT = urljoin(API_BASE_URL, '/api/country/country-data/batch')
     CONTAINER_CHECK_ENDPOINT = urljoin(API_BASE_URL, '/api/container/container-check')
 
-# Debug: Print environment variables (masked for security)
-print("\nDebug: Environment Variables:")
-print(f"OPENAI_API_KEY exists: {'Yes' if OPENAI_API_KEY else 'No'}")
-print(f"API_BASE_URL: {API_BASE_URL or 'Using relative paths'}\n")
+# Tool transport: "auto" calls the sub-apps in-process when server.py mounts
+# them into this process, "http" always uses the endpoints above
+dispatcher = ToolDispatcher(
+    country_data_endpoint=COUNTRY_DATA_ENDPOINT,
+    country_data_batch_endpoint=COUNTRY_DATA_BATCH_ENDPOINT,
+    container_check_endpoint=CONTAINER_CHECK_ENDPOINT,
+    verify=bool(API_BASE_URL),  # Only verify SSL in local environment
+    mode=os.getenv("TOOL_DISPATCH", "auto"),
+    pool_size=int(os.getenv("TOOL_HTTP_POOL_SIZE", "20")),
+    timeout=float(os.getenv("TOOL_HTTP_TIMEOUT", "10")),
+    keepalive_expiry=float(os.getenv("TOOL_HTTP_KEEPALIVE", "30")),
+    max_concurrency=int(os.getenv("TOOL_MAX_CONCURRENCY", "0")) or None,
+)
+
+# Tool results are cached across conversations; TOOL_CACHE_SIZE=0 disables it
+tool_cache = ToolResultCache(maxsize=int(os.getenv("TOOL_CACHE_SIZE", "1024")))
+# Cached port lookups are stale as soon as the dataset changes
+port_registry.subscribe(lambda: tool_cache.invalidate("country_data"))
+
+# Identical cache misses in flight at the same time share one backend call
+tool_flight = SingleFlight()
+tool_aflight = AsyncSingleFlight()
+
+def _cached(tool: str, request: BaseModel, call) -> Dict[str, Any]:
+    payload = tool_cache.get(tool, request)
+    if payload is None:
+        def fetch():
+            result = call(request)
+            tool_cache.put(tool, request, result)
+            return result
+        payload = tool_flight.do(tool_cache.key(tool, request), fetch)
+    return payload
+
+async def _acached(tool: str, request: BaseModel, call) -> Dict[str, Any]:
+    payload = tool_cache.get(tool, request)
+    if payload is None:
+        async def fetch():
+            result = await call(request)
+            tool_cache.put(tool, request, result)
+            return result
+        payload = await tool_aflight.do(tool_cache.key(tool, request), fetch)
+    return payload
+
+def _batch_lookup(request_objs: List[BaseModel]) -> List[Optional[Dict[str, Any]]]:
+    """Batch items answered from the cache, None where the backend is needed."""
+    results = []
+    for request_obj in request_objs:
+        payload = tool_cache.get("country_data", request_obj)
+        results.append({"status": 200, **payload} if payload is not None else None)
+    return results
+
+def _batch_merge(request_objs: List[BaseModel], results: List[Optional[Dict[str, Any]]], response: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill the cache misses from the backend response and cache the successes."""
+    missing = [i for i, result in enumerate(results) if result is None]
+    for i, item in zip(missing, response["data"]):
+        results[i] = item
+        if item.get("status") == 200:
+            payload = {key: value for key, value in item.items() if key != "status"}
+            tool_cache.put("country_data", request_objs[i], payload)
+    return {"data": results}
+
+def _batch_key(request_objs: List[BaseModel]) -> tuple:
+    return ("batch",) + tuple(tool_cache.key("country_data", r) for r in request_objs)
+
+def _cached_batch(request_objs: List[BaseModel]) -> Dict[str, Any]:
+    results = _batch_lookup(request_objs)
+    missing = [request_objs[i] for i, result in enumerate(results) if result is None]
+    response = {"data": []}
+    if missing:
+        response = tool_flight.do(_batch_key(missing), lambda: dispatcher.country_data_batch(missing))
+    return _batch_merge(request_objs, results, response)
+
+async def _acached_batch(request_objs: List[BaseModel]) -> Dict[str, Any]:
+    results = _batch_lookup(request_objs)
+    missing = [request_objs[i] for i, result in enumerate(results) if result is None]
+    response = {"data": []}
+    if missing:
+        response = await tool_aflight.do(_batch_key(missing), lambda: dispatcher.acountry_data_batch(missing))
+    return _batch_merge(request_objs, results, response)
 
 # Add these new models at the top level, before the CountryDataTool class
+CountryDataOperation = TypedRequest
+
 class WrappedRequest(BaseModel):
-    root: Union[GetEntryRequest, SearchRequest, SameCountryRequest]
+    root: Union[CountryDataOperation, List[CountryDataOperation]]
+
+# Flat tool-facing form of one country_data operation. The schema goes out with
+# every model call, so it stays small; _parse_request maps it onto the typed requests
+class CountryDataOp(BaseModel):
+    model_config = ConfigDict(json_schema_extra=lambda schema: schema.pop("title", None))
+
+    operation: Literal["get_entry", "search", "same_country"]
+    entry_id: str = Field(default="", description="get_entry")
+    search_query: str = Field(default="", description="search")
+    entry1_id: str = Field(default="", description="same_country")
+    entry2_id: str = Field(default="", description="same_country")
+    limit: int = Field(default=0, description="search page size")
+    offset: int = Field(default=0, description="search page offset")
+
+class CountryDataArgs(BaseModel):
+    model_config = ConfigDict(json_schema_extra=lambda schema: schema.pop("title", None))
+
+    operations: List[CountryDataOp] = Field(min_length=1)
 
 class CountryDataTool(BaseTool):
     name: str = "country_data"
-    description: str = """Use this tool to validate port information or search for port codes.
-    Input should be a JSON object with:
-    - operation: One of 'get_entry', 'search', or 'same_country'
-    - For get_entry: entry_id (required)
-    - For search: search_query (required)
-    - For same_country: entry1_id and entry2_id (both required)
-    """
-    args_schema: Type[BaseModel] = WrappedRequest
+    description: str = (
+        "Validate ports or find port codes. get_entry: port by code. "
+        "search: ranked, typo-tolerant port search. same_country: whether two ports share a country. "
+        "Put several operations in one call, e.g. get_entry for both ports plus same_country."
+    )
+    args_schema: Type[BaseModel] = CountryDataArgs
+
+    def _parse_request(self, args: tuple, kwargs: Dict[str, Any]) -> Union[CountryDataOperation, List[CountryDataOperation]]:
+        """Turn the tool input into one request object or a list for a batch."""
+        # Handle both positional and keyword arguments
+        if args and isinstance(args[0], (str, dict, list)):
+            request_data = args[0]
+        elif kwargs:
+            request_data = kwargs
+        else:
+            raise ValueError("No valid input data provided")
+
+        # Parse the input into our WrappedRequest model
+        if isinstance(request_data, str):
+            request_data = json.loads(request_data)
+        elif isinstance(request_data, dict):
+            if 'args' in request_data:
+                request_data = request_data['args']
+            elif 'function' in request_data and 'arguments' in request_data['function']:
+                request_data = json.loads(request_data['function']['arguments'])
+            if 'operations' in request_data:
+                # Compact tool schema: one operation is a single request, more are a batch
+                operations = [
+                    op.model_dump(exclude_defaults=True) if isinstance(op, BaseModel) else op
+                    for op in request_data['operations']
+                ]
+                request_data = {'root': operations[0] if len(operations) == 1 else operations}
+            elif 'root' in request_data:
+                # If we got the root directly as a kwarg
+                request_data = {'root': request_data['root']}
+        if isinstance(request_data, list):
+            # A bare list of operations is a batch
+            request_data = {'root': request_data}
+
+        # Validate and parse the request using our WrappedRequest model
+        return WrappedRequest.model_validate(request_data).root
 
     def _run(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
         """Run the tool."""
         try:
-            # Handle both positional and keyword arguments
-            if args and isinstance(args[0], (str, dict)):
-                request_data = args[0]
-            elif kwargs:
-                request_data = kwargs
-            else:
-                raise ValueError("No valid input data provided")
-
-            # Parse the input into our WrappedRequest model
-            if isinstance(request_data, str):
-                request_data = json.loads(request_data)
-            elif isinstance(request_data, dict):
-                if 'args' in request_data:
-                    request_data = request_data['args']
-                elif 'function' in request_data and 'arguments' in request_data['function']:
-                    request_data = json.loads(request_data['function']['arguments'])
-                elif 'root' in request_data:
-                    # If we got the root directly as a kwarg
-                    request_data = {'root': request_data['root']}
-
-            # Validate and parse the request using our WrappedRequest model
-            wrapped_request = WrappedRequest.model_validate(request_data)
-            request_obj = wrapped_request.root
-
-            # Send the request to the API
-            response = requests.post(
-                COUNTRY_DATA_ENDPOINT,
-                json=request_obj.model_dump(),
-                verify=bool(API_BASE_URL)  # Only verify SSL in local environment
-            )
-            response.raise_for_status()
-            return response.json()
+            with span("parse_request", "validation"):
+                request_obj = self._parse_request(args, kwargs)
+            # Send the request to the sub-app, batching lists into one round trip
+            if isinstance(request_obj, list):
+                return _cached_batch(request_obj)
+            return _cached(self.name, request_obj, dispatcher.country_data)
         except json.JSONDecodeError as e:
             return {"error": f"Invalid JSON format: {str(e)}"}
+        except DispatchError as e:
+            return e.to_payload()
         except requests.exceptions.RequestException as e:
             return {"error": f"API request failed: {str(e)}"}
         except Exception as e:
             return {"error": f"Tool execution error: {str(e)}"}
 
+    async def _arun(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        """Run the tool without blocking the event loop."""
+        try:
+            with span("parse_request", "validation"):
+                request_obj = self._parse_request(args, kwargs)
+            if isinstance(request_obj, list):
+                return await _acached_batch(request_obj)
+            return await _acached(self.name, request_obj, dispatcher.acountry_data)
+        except json.JSONDecodeError as e:
+            return {"error": f"Invalid JSON format: {str(e)}"}
+        except DispatchError as e:
+            return e.to_payload()
+        except httpx.HTTPError as e:
+            return {"error": f"API request failed: {str(e)}"}
+        except Exception as e:
+            return {"error": f"Tool execution error: {str(e)}"}
+
 class ContainerCheckTool(BaseTool):
     name: str = "container_check"
-    description: str = """Use this tool to validate container configurations.
-    Input should be a JSON object with a list of containers, each having:
-    - type: One of 'HH42', 'HH24', or 'HH12'
-    - count: Number of containers (must be >= 0)
-    At least one container type must have a count greater than 0.
-    """
+    description: str = "Validate container counts per type (HH42, HH24, HH12); at least one count must be above 0."
     args_schema: Type[BaseModel] = ContainerRequest
 
-    def _run(self, request: ContainerRequest) -> Dict[str, Any]:
+    def _run(self, containers: List[ContainerCount]) -> Dict[str, Any]:
         """Run the tool."""
         try:
-            response = requests.post(
-                CONTAINER_CHECK_ENDPOINT,
-                json=request.model_dump(),
-                verify=bool(API_BASE_URL)  # Only verify SSL in local environment
-            )
-            response.raise_for_status()
-            return response.json()
+            with span("ContainerRequest", "validation"):
+                request = ContainerRequest(containers=containers)
+            return _cached(self.name, request, dispatcher.container_check)
+        except DispatchError as e:
+            return e.to_payload()
         except requests.exceptions.RequestException as e:
             return {"error": str(e)}
 
-# Initialize LLM with explicit API key
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo",
-    temperature=0.7,
-    api_key=OPENAI_API_KEY
-)
+    async def _arun(self, containers: List[ContainerCount]) -> Dict[str, Any]:
+        """Run the tool without blocking the event loop."""
+        try:
+            with span("ContainerRequest", "validation"):
+                request = ContainerRequest(containers=containers)
+            return await _acached(self.name, request, dispatcher.acontainer_check)
+        except DispatchError as e:
+            return e.to_payload()
+        except httpx.HTTPError as e:
+            return {"error": str(e)}
+
+# Rate limits and transient API failures are retried with jittered backoff,
+# honouring Retry-After; the OpenAI client's own retries are turned off
+llm_retry = UpstreamRetry(max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")))
 
 # Define list of tools
 tools = [
@@ -136,19 +267,137 @@ tools = [
 
 system_prompt = """Collect information about the origin port and the destination port. 
 Use the country_data tool to validate the information or to search for the port codes if not provided. 
+When both port codes are known, validate both ports and check their countries in a single country_data call with a list of operations. 
 Assure that the origin and the destination port are NOT in the same country. 
 If yes, ask the user to provide the port codes again. 
 Check the number of containers of different types (HH42, HH24, HH12). 
 There must be at least 1 container given in one category. 
 Use the container check tool to check the number and type of containers. 
+When the ports and the containers are all given, call country_data and container_check together in the same step. 
 If the type is wrong or the number is not at least 1 ask the user to provide the correct container information."""
 
-# Create the agent with explicit configuration
-byo_chatgpt = create_react_agent(
-    llm,
-    tools,
-    prompt=system_prompt
-)
+# Prompt budget per model call, including the system prompt and tool schemas;
+# older tool results are compacted and the oldest turns dropped to stay under it
+AGENT_TOKEN_BUDGET = int(os.getenv("AGENT_TOKEN_BUDGET", "4000"))
+
+# Fully specified bookings are answered without the LLM; AGENT_FAST_PATH=0 disables it
+FAST_PATH_ENABLED = os.getenv("AGENT_FAST_PATH", "1") != "0"
+
+def fast_path_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Answer the turn deterministically when the booking is fully specified."""
+    reply = fast_path.try_answer(state["messages"]) if FAST_PATH_ENABLED else None
+    return {"messages": [reply]} if reply is not None else {}
+
+def route_after_fast_path(state: Dict[str, Any]) -> str:
+    # The fast path leaves an AI reply behind when it handled the turn
+    return END if isinstance(state["messages"][-1], AIMessage) else "agent"
+
+# Conversation state per thread_id, so clients only send the new message;
+# AGENT_CHECKPOINT_DB= (empty) turns it off and every request carries the full history
+AGENT_CHECKPOINT_DB = os.getenv("AGENT_CHECKPOINT_DB", "agent_threads.sqlite")
+
+class AgentComponents(NamedTuple):
+    """The compiled agent graph and the parts the server reports on."""
+    graph: Any
+    # The same graph without the thread store, for requests that carry the full history
+    stateless_graph: Any
+    react_agent: Any
+    llm: Any
+    token_budget: Any
+    checkpointer: Optional[Any]
+    llm_cassette: Optional[Any]
+
+@functools.lru_cache(maxsize=None)
+def get_agent() -> AgentComponents:
+    """Build the agent on first use and return the same one afterwards.
+
+    The LLM client, graph and thread store are built here rather than at
+    import, so importing this module stays cheap and needs no API key.
+    """
+    # Imported here: together they take seconds to load
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+    from langgraph.graph import START, MessagesState, StateGraph
+    from langgraph.prebuilt import create_react_agent
+    from langchain_react_agent.cassette import Cassette, llm_http_clients
+    from langchain_react_agent.checkpoint import ThreadCheckpointer
+    from langchain_react_agent.llm import RetryingChatOpenAI
+    from langchain_react_agent.token_budget import TokenBudget, make_token_counter
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        if AGENT_LLM_MODE != "replay":
+            raise ValueError("OPENAI_API_KEY environment variable is not set")
+        api_key = "replay"
+    logger.debug("API_BASE_URL: %s", API_BASE_URL or "using relative paths")
+
+    llm_cassette = Cassette(AGENT_LLM_CASSETTE) if AGENT_LLM_MODE != "live" else None
+
+    # Initialize LLM with explicit API key
+    llm = RetryingChatOpenAI(
+        model="gpt-3.5-turbo",
+        temperature=0.7,
+        api_key=api_key,
+        max_retries=0,
+        retry=llm_retry,
+        **llm_http_clients(AGENT_LLM_MODE, llm_cassette, AGENT_LLM_REPLAY_LATENCY),
+    )
+
+    token_counter = make_token_counter(llm.model_name)
+    token_budget = TokenBudget(
+        max_tokens=AGENT_TOKEN_BUDGET,
+        fixed_tokens=token_counter([
+            SystemMessage(content=system_prompt),
+            SystemMessage(content=json.dumps([convert_to_openai_tool(t) for t in tools])),
+        ]),
+        token_counter=token_counter,
+    )
+
+    # Create the agent with explicit configuration
+    react_agent = create_react_agent(
+        llm,
+        tools,
+        prompt=system_prompt,
+        pre_model_hook=token_budget.pre_model_hook,
+        post_model_hook=token_budget.post_model_hook,
+    )
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("fast_path", fast_path_node)
+    builder.add_node("agent", react_agent)
+    builder.add_edge(START, "fast_path")
+    builder.add_conditional_edges("fast_path", route_after_fast_path, ["agent", END])
+
+    checkpointer = ThreadCheckpointer(
+        AGENT_CHECKPOINT_DB,
+        cache_size=int(os.getenv("AGENT_THREAD_CACHE_SIZE", "256")),
+        ttl=float(os.getenv("AGENT_THREAD_TTL", str(24 * 3600))),
+    ) if AGENT_CHECKPOINT_DB else None
+
+    graph = builder.compile(checkpointer=checkpointer)
+    return AgentComponents(
+        graph=graph,
+        stateless_graph=builder.compile() if checkpointer is not None else graph,
+        react_agent=react_agent,
+        llm=llm,
+        token_budget=token_budget,
+        checkpointer=checkpointer,
+        llm_cassette=llm_cassette,
+    )
+
+# Module attributes from before get_agent(); reading one builds the agent
+_AGENT_ATTRIBUTES = {
+    "byo_chatgpt": "graph",
+    "react_agent": "react_agent",
+    "llm": "llm",
+    "token_budget": "token_budget",
+    "checkpointer": "checkpointer",
+    "llm_cassette": "llm_cassette",
+}
+
+def __getattr__(name):
+    if name not in _AGENT_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(get_agent(), _AGENT_ATTRIBUTES[name])
 
 # Export the agent for use in the server
-__all__ = ["byo_chatgpt"]
+__all__ = ["byo_chatgpt", "get_agent"]
@@ -0,0 +1,157 @@
+"""Offline validation of booking exports.
+
+Applies the rules the agent enforces in conversation to every row of a
+CSV or NDJSON export: both ports must exist, they must be in different
+countries, and the containers must pass the container check. Rows are
+read lazily and validated in chunks across a process pool; results are
+written as NDJSON in input order, so a run can resume from the number of
+rows already written.
+"""
+
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, TextIO
+import csv
+import itertools
+import json
+
+from fastapi import HTTPException
+
+from langchain_react_agent import country_data
+from langchain_react_agent.container_data import ContainerRequest, ContainerType, check_containers
+
+# Rows per unit of work sent to a worker process
+DEFAULT_CHUNK_SIZE = 2000
+# Key of the placeholder row read_rows yields for a line it cannot parse
+ROW_ERROR = "__error__"
+
+
+def read_rows(handle: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    """Yield booking rows from a CSV (with a header) or NDJSON stream.
+
+    An NDJSON line that is not a JSON object still yields a row, holding
+    only the error under ROW_ERROR, so it gets an invalid result in its
+    place and the rows after it are validated as usual.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(handle)
+    elif fmt == "ndjson":
+        for line in handle:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield {ROW_ERROR: f"Invalid JSON: {str(e)}"}
+                continue
+            if not isinstance(row, dict):
+                yield {ROW_ERROR: f"Row is not a JSON object: {type(row).__name__}"}
+                continue
+            yield row
+    else:
+        raise ValueError(f"Invalid input format: {fmt}. Valid formats are: csv, ndjson")
+
+
+def containers_of(row: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Containers as a list of {type, count}, from a containers field or per-type columns."""
+    containers = row.get("containers")
+    if isinstance(containers, str):
+        containers = json.loads(containers)
+    if containers is not None:
+        return containers
+    # CSV exports carry one count column per container type
+    return [
+        {"type": container_type.value, "count": int(row[container_type.value] or 0)}
+        for container_type in ContainerType
+        if container_type.value in row
+    ]
+
+
+def validate_booking(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Check one booking; returns valid, the errors found and the container totals."""
+    if ROW_ERROR in row:
+        return {"valid": False, "errors": [row[ROW_ERROR]], "totals": None}
+    errors = []
+    registry = country_data.registry
+    origin = registry.get(str(row.get("origin") or "").strip())
+    destination = registry.get(str(row.get("destination") or "").strip())
+    if origin is None:
+        errors.append(f"Unknown origin port: {row.get('origin')}")
+    if destination is None:
+        errors.append(f"Unknown destination port: {row.get('destination')}")
+    if origin is not None and destination is not None and origin.country == destination.country:
+        errors.append(f"Origin and destination are both in {origin.country}")
+
+    totals = None
+    try:
+        result = check_containers(ContainerRequest(containers=containers_of(row)))
+        totals = {t.value: result["data"]["totals"][t] for t in ContainerType}
+    except HTTPException as he:
+        errors.append(he.detail)
+    except Exception as e:
+        errors.append(f"Invalid containers: {str(e)}")
+
+    result = {"valid": not errors, "errors": errors, "totals": totals}
+    if "id" in row:
+        result = {"id": row["id"], **result}
+    return result
+
+
+def validate_chunk(start: int, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Validate a chunk of rows; `row` in each result is the offset in the input."""
+    return [{"row": start + i, **validate_booking(row)} for i, row in enumerate(rows)]
+
+
+def chunked(rows: Iterable[Dict[str, Any]], size: int, start: int = 0) -> Iterator[tuple]:
+    """Yield (offset, rows) chunks of the input, skipping the first `start` rows."""
+    rows = itertools.islice(rows, start, None)
+    offset = start
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield offset, chunk
+        offset += len(chunk)
+
+
+def run(
+    rows: Iterable[Dict[str, Any]],
+    output: TextIO,
+    workers: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    start: int = 0,
+    on_chunk: Optional[Callable[[int, int, int], None]] = None,
+) -> Dict[str, int]:
+    """Validate rows from offset `start` and write NDJSON results in input order.
+
+    With workers > 0 chunks run on a process pool; at most two chunks per
+    worker are in flight, so memory stays bounded by the chunk size rather
+    than the input. on_chunk(offset, rows, invalid) is called after each
+    chunk has been written and flushed, with the offset to resume from.
+    """
+    counts = {"rows": 0, "invalid": 0}
+
+    def write(results: List[Dict[str, Any]]) -> None:
+        invalid = sum(not result["valid"] for result in results)
+        output.writelines(json.dumps(result) + "\n" for result in results)
+        output.flush()
+        counts["rows"] += len(results)
+        counts["invalid"] += invalid
+        if on_chunk is not None:
+            on_chunk(results[-1]["row"] + 1, len(results), invalid)
+
+    if workers <= 0:
+        for offset, chunk in chunked(rows, chunk_size, start):
+            write(validate_chunk(offset, chunk))
+        return counts
+
+    executor: Executor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = deque()
+        for offset, chunk in chunked(rows, chunk_size, start):
+            pending.append(executor.submit(validate_chunk, offset, chunk))
+            if len(pending) >= 2 * workers:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+    return counts
@@ -0,0 +1,145 @@
+"""Size-bounded TTL/LRU cache for agent tool results.
+
+Port and container rules are effectively static, so the tools keep recent
+successful results keyed on the normalized request model. Entries expire
+per operation, the least recently used ones are evicted when the cache is
+full, and invalidate() drops cached results when the port dataset changes.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import threading
+import time
+
+from pydantic import BaseModel
+
+from langchain_react_agent.port_registry import normalize
+
+# Seconds a cached result stays valid, per operation
+DEFAULT_TTLS: Dict[str, float] = {
+    "get_entry": 3600.0,
+    "same_country": 3600.0,
+    "search": 300.0,
+    "container_check": 3600.0,
+}
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire after a per-entry TTL."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if it is missing or expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard_where(self, predicate) -> int:
+        """Drop every entry whose key matches the predicate; returns the count."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class ToolResultCache:
+    """Caches successful tool payloads keyed on (tool, operation, request)."""
+
+    def __init__(self, maxsize: int = 1024, ttls: Optional[Dict[str, float]] = None):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._cache = TTLCache(maxsize)
+        self._counts_lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    @staticmethod
+    def operation(tool: str, request: BaseModel) -> str:
+        operation = getattr(request, "operation", None)
+        return operation.value if operation is not None else tool
+
+    @classmethod
+    def key(cls, tool: str, request: BaseModel) -> Tuple[str, str, str]:
+        """Normalized cache key; search is case-insensitive, so is its key."""
+        operation = cls.operation(tool, request)
+        if operation == "search":
+            request = request.model_copy(update={"search_query": normalize(request.search_query)})
+        return tool, operation, request.model_dump_json()
+
+    def _count(self, counter: Dict[str, int], operation: str) -> None:
+        with self._counts_lock:
+            counter[operation] = counter.get(operation, 0) + 1
+
+    def get(self, tool: str, request: BaseModel) -> Optional[Dict[str, Any]]:
+        key = self.key(tool, request)
+        value = self._cache.get(key)
+        self._count(self.hits if value is not None else self.misses, key[1])
+        return value
+
+    def put(self, tool: str, request: BaseModel, payload: Dict[str, Any]) -> None:
+        """Store a successful payload; errors are never cached."""
+        if "error" in payload:
+            return
+        operation = self.operation(tool, request)
+        self._cache.set(self.key(tool, request), payload, self.ttls.get(operation, 0.0))
+
+    def invalidate(self, tool: Optional[str] = None) -> int:
+        """Drop cached results for one tool, or everything; returns the count."""
+        if tool is None:
+            count = len(self._cache)
+            self._cache.clear()
+            return count
+        return self._cache.discard_where(lambda key: key[0] == tool)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counts_lock:
+            hits = sum(self.hits.values())
+            misses = sum(self.misses.values())
+            per_operation = {
+                operation: {
+                    "hits": self.hits.get(operation, 0),
+                    "misses": self.misses.get(operation, 0),
+                }
+                for operation in sorted(set(self.hits) | set(self.misses))
+            }
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "evictions": self._cache.evictions,
+            "expirations": self._cache.expirations,
+            "operations": per_operation,
+        }
@@ -0,0 +1,188 @@
+"""Record and replay of LLM API exchanges for offline load tests.
+
+The switch sits at the HTTP transport under the OpenAI client, so the rest
+of the pipeline (ChatOpenAI, retries, tool calling, the graph) runs exactly
+as in production. In record mode every request is sent upstream and each
+successful request/response pair is appended to a cassette (NDJSON, one
+exchange per line). In replay mode nothing leaves the process: responses, including tool
+calls and streamed chunks, are served from the cassette after a simulated
+latency, either the one measured while recording or a fixed value.
+
+Exchanges are looked up by a hash of the request method, path and JSON
+body, so a replayed conversation needs the same inputs as the recorded one.
+A request with no recording gets a 404, which the client raises as an
+error instead of retrying.
+"""
+
+from typing import Any, Dict, Optional, Union
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+import httpx
+
+LLM_MODES = ("live", "record", "replay")
+
+
+def request_key(request: httpx.Request) -> str:
+    """Stable key of a request: method, path and the body with sorted keys."""
+    body = request.content
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode()
+    except ValueError:
+        pass
+    digest = hashlib.sha256(f"{request.method} {request.url.path}\n".encode() + body)
+    return digest.hexdigest()
+
+
+class Cassette:
+    """Exchanges in an NDJSON file; the first recording of a key wins on replay."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.exchanges: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip():
+                        exchange = json.loads(line)
+                        self.exchanges.setdefault(exchange["key"], exchange)
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, request: httpx.Request, response: httpx.Response, latency: float) -> None:
+        if not response.is_success:
+            # Rate limits and errors aren't worth replaying
+            return
+        exchange = {
+            "key": request_key(request),
+            "method": request.method,
+            "path": request.url.path,
+            "request": request.content.decode("utf-8", errors="replace"),
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", "application/json"),
+            "body": response.content.decode("utf-8"),
+            "latency_ms": round(latency * 1000, 1),
+        }
+        line = json.dumps(exchange) + "\n"
+        with self._lock:
+            self.exchanges.setdefault(exchange["key"], exchange)
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line)
+
+    def lookup(self, request: httpx.Request) -> Optional[Dict[str, Any]]:
+        exchange = self.exchanges.get(request_key(request))
+        with self._lock:
+            if exchange is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return exchange
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "exchanges": len(self.exchanges), "hits": self.hits, "misses": self.misses}
+
+
+class RecordingTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Sends requests upstream and records each exchange.
+
+    Responses are read in full before they are returned, so streamed
+    completions arrive in one piece while recording.
+    """
+
+    def __init__(self, cassette: Cassette, transport: Any = None, async_transport: Any = None):
+        self.cassette = cassette
+        self.transport = transport or httpx.HTTPTransport()
+        self.async_transport = async_transport or httpx.AsyncHTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = self.transport.handle_request(request)
+        response.read()
+        self.cassette.record(request, response, time.perf_counter() - start)
+        return _decoded(response)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.async_transport.handle_async_request(request)
+        await response.aread()
+        self.cassette.record(request, response, time.perf_counter() - start)
+        return _decoded(response)
+
+    def close(self) -> None:
+        self.transport.close()
+
+    async def aclose(self) -> None:
+        await self.async_transport.aclose()
+
+
+def _decoded(response: httpx.Response) -> httpx.Response:
+    """A copy of a read response whose body no longer needs decoding."""
+    headers = [
+        (name, value) for name, value in response.headers.multi_items()
+        if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+    ]
+    return httpx.Response(response.status_code, headers=headers, content=response.content)
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Answers requests from a cassette after a simulated latency.
+
+    latency is "recorded" for the latency measured while recording, or a
+    fixed number of milliseconds. The async side sleeps without blocking
+    the event loop, so many replayed calls can be in flight at once.
+    """
+
+    def __init__(self, cassette: Cassette, latency: Union[str, float] = "recorded"):
+        self.cassette = cassette
+        self.latency = latency
+
+    def _delay(self, exchange: Optional[Dict[str, Any]]) -> float:
+        if self.latency == "recorded":
+            return exchange["latency_ms"] / 1000 if exchange else 0.0
+        return float(self.latency) / 1000
+
+    def _response(self, request: httpx.Request, exchange: Optional[Dict[str, Any]]) -> httpx.Response:
+        if exchange is None:
+            return httpx.Response(
+                404,
+                json={"error": {
+                    "message": f"No recorded response in {self.cassette.path} for this request",
+                    "type": "cassette_miss",
+                    "code": "cassette_miss",
+                }},
+                request=request,
+            )
+        return httpx.Response(
+            exchange["status"],
+            headers={"content-type": exchange["content_type"]},
+            content=exchange["body"].encode("utf-8"),
+            request=request,
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        exchange = self.cassette.lookup(request)
+        time.sleep(self._delay(exchange))
+        return self._response(request, exchange)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        exchange = self.cassette.lookup(request)
+        await asyncio.sleep(self._delay(exchange))
+        return self._response(request, exchange)
+
+
+def llm_http_clients(mode: str, cassette: Optional[Cassette], latency: Union[str, float] = "recorded") -> Dict[str, Any]:
+    """The http_client/http_async_client arguments for ChatOpenAI in `mode`."""
+    if mode not in LLM_MODES:
+        raise ValueError(f"Invalid LLM mode: {mode}. Valid modes are: {', '.join(LLM_MODES)}")
+    if mode == "live":
+        return {}
+    transport = RecordingTransport(cassette) if mode == "record" else ReplayTransport(cassette, latency)
+    return {
+        "http_client": httpx.Client(transport=transport),
+        "http_async_client": httpx.AsyncClient(transport=transport),
+    }
@@ -0,0 +1,267 @@
+"""Persistent conversation state for agent threads.
+
+ThreadCheckpointer stores LangGraph checkpoints in an embedded SQLite file
+and keeps the latest checkpoint of recently active threads in an in-memory
+LRU, so a follow-up turn only sends the new message and resumes without
+re-reading and deserializing the whole history. Threads that have been idle
+longer than the TTL are deleted.
+
+Several worker processes can share one database file. A cached checkpoint
+is only used while it is still the thread's latest one in the database, so
+a turn handled by another worker is never answered from a stale copy.
+"""
+
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    copy_checkpoint,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+
+class ThreadCheckpointer(SqliteSaver):
+    """SQLite checkpointer with an LRU front for latest checkpoints and thread TTLs."""
+
+    def __init__(
+        self,
+        path: str,
+        cache_size: int = 256,
+        ttl: float = 24 * 3600,
+        sweep_interval: float = 60.0,
+    ):
+        super().__init__(sqlite3.connect(path, check_same_thread=False))
+        self.path = path
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._latest: "OrderedDict[Tuple[str, str], CheckpointTuple]" = OrderedDict()
+        self._latest_lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.hits = 0
+        self.misses = 0
+        if hasattr(os, "register_at_fork"):
+            # A SQLite connection must not be used across fork (see prefork.py)
+            os.register_at_fork(after_in_child=self._reopen)
+
+    def _reopen(self) -> None:
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self._latest_lock = threading.Lock()
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        # Runs under self.lock, taken by cursor()
+        super().setup()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS thread_activity (thread_id TEXT PRIMARY KEY, last_seen REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    # LRU front
+
+    def _cache_get(self, key: Tuple[str, str]) -> Optional[CheckpointTuple]:
+        with self._latest_lock:
+            value = self._latest.get(key)
+            if value is None:
+                return None
+            self._latest.move_to_end(key)
+        # Runs update versions_seen in place, so hand out a copy
+        return value._replace(checkpoint=copy_checkpoint(value.checkpoint))
+
+    def _cache_set(self, key: Tuple[str, str], value: CheckpointTuple) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._latest_lock:
+            self._latest[key] = value
+            self._latest.move_to_end(key)
+            while len(self._latest) > self.cache_size:
+                self._latest.popitem(last=False)
+
+    def _cache_drop(self, thread_id: str) -> None:
+        with self._latest_lock:
+            for key in [key for key in self._latest if key[0] == thread_id]:
+                del self._latest[key]
+
+    def _is_latest(self, key: Tuple[str, str], value: CheckpointTuple) -> bool:
+        """Whether a cached tuple still matches the database, which other workers may have written."""
+        with self.cursor(transaction=False) as cur:
+            cur.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1",
+                key,
+            )
+            row = cur.fetchone()
+            checkpoint_id = value.config["configurable"]["checkpoint_id"]
+            if row is None or row[0] != checkpoint_id:
+                return False
+            cur.execute(
+                "SELECT COUNT(*) FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (*key, checkpoint_id),
+            )
+            return cur.fetchone()[0] == len(value.pending_writes or ())
+
+    @staticmethod
+    def _key(config: RunnableConfig) -> Tuple[str, str]:
+        configurable = config["configurable"]
+        return str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+
+    # TTL
+
+    def _touch(self, thread_id: str) -> None:
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT INTO thread_activity (thread_id, last_seen) VALUES (?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (thread_id, time.time()),
+            )
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.expire()
+
+    def expire(self) -> int:
+        """Delete threads idle for longer than the TTL; returns how many."""
+        cutoff = time.time() - self.ttl
+        with self.cursor(transaction=False) as cur:
+            cur.execute("SELECT thread_id FROM thread_activity WHERE last_seen < ?", (cutoff,))
+            stale = [row[0] for row in cur.fetchall()]
+        for thread_id in stale:
+            self.delete_thread(thread_id)
+        return len(stale)
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),))
+        self._cache_drop(str(thread_id))
+
+    # BaseCheckpointSaver
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        self._maybe_sweep()
+        if get_checkpoint_id(config):
+            return super().get_tuple(config)
+        key = self._key(config)
+        value = self._cache_get(key)
+        if value is not None and self._is_latest(key, value):
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = super().get_tuple(config)
+        if value is not None:
+            self._cache_set(key, value)
+        return value
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        saved_config = super().put(config, checkpoint, metadata, new_versions)
+        key = self._key(saved_config)
+        parent_id = config["configurable"].get("checkpoint_id")
+        # The checkpoint just written is the thread's latest and has no writes yet
+        self._cache_set(
+            key,
+            CheckpointTuple(
+                saved_config,
+                copy_checkpoint(checkpoint),
+                get_checkpoint_metadata(config, metadata),
+                {
+                    "configurable": {
+                        "thread_id": key[0],
+                        "checkpoint_ns": key[1],
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None,
+                [],
+            ),
+        )
+        if not key[1]:
+            self._touch(key[0])
+        return saved_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        super().put_writes(config, writes, task_id, task_path)
+        # Pending writes belong to the cached tuple; reload it on the next read
+        with self._latest_lock:
+            self._latest.pop(self._key(config), None)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.cursor(transaction=False) as cur:
+            cur.execute("SELECT COUNT(*) FROM thread_activity")
+            threads = cur.fetchone()[0]
+        return {
+            "threads": threads,
+            "cached": len(self._latest),
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "ttl": self.ttl,
+        }
+
+    def close(self) -> None:
+        self.conn.close()
@@ -1,8 +1,16 @@
-from typing import List, Optional, Literal, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from fastapi import FastAPI, HTTPException, Request
-from pydantic import BaseModel, Field, RootModel
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from pydantic_core import to_json
 from enum import Enum
-import json
+import logging
+
+from langchain_react_agent.responses import FastJSONResponse
+
+logger = logging.getLogger(__name__)
 
 # Define models
 class ContainerType(str, Enum):
@@ -17,6 +25,145 @@ class ContainerCount(BaseModel):
 class ContainerRequest(BaseModel):
     containers: List[ContainerCount]
 
+def check_containers(validated_data: ContainerRequest) -> Dict[str, Any]:
+    """Validate a container request; raises HTTPException when it is not bookable."""
+    # Check if we have at least one container type with count > 0
+    has_containers = any(container.count > 0 for container in validated_data.containers)
+    
+    # Validate container types
+    container_types = {container.type for container in validated_data.containers}
+    valid_types = {ContainerType.HH42, ContainerType.HH24, ContainerType.HH12}
+    invalid_types = container_types - valid_types
+    
+    if invalid_types:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid container types: {', '.join(invalid_types)}. Valid types are: {', '.join(valid_types)}"
+        )
+    
+    if not has_containers:
+        raise HTTPException(
+            status_code=400,
+            detail="At least one container type must have a count greater than 0"
+        )
+
+    # Calculate totals
+    totals = {
+        container.type: container.count
+        for container in validated_data.containers
+    }
+    
+    # Add missing container types with count 0
+    for container_type in valid_types:
+        if container_type not in totals:
+            totals[container_type] = 0
+
+    return {
+        "data": {
+            "valid": True,
+            "message": "Container configuration is valid",
+            "totals": totals,
+            "has_containers": has_containers
+        }
+    }
+
+# Records validated per pass of the bulk endpoint, and the longest record it accepts
+BULK_BATCH_SIZE = 1000
+MAX_RECORD_BYTES = 64 * 1024
+
+container_request_list = TypeAdapter(List[ContainerRequest])
+
+def check_request(validated_data: ContainerRequest) -> Dict[str, Any]:
+    try:
+        return {"status": 200, **check_containers(validated_data)}
+    except HTTPException as he:
+        return {"status": he.status_code, "error": he.detail}
+
+def check_record(line: Optional[bytes]) -> Dict[str, Any]:
+    """Validate one NDJSON record; failures are reported like the single endpoint's 400s."""
+    if line is None:
+        return {"status": 400, "error": f"Record exceeds {MAX_RECORD_BYTES} bytes"}
+    try:
+        validated_data = ContainerRequest.model_validate_json(line)
+    except Exception as e:
+        return {"status": 400, "error": f"Invalid request format: {str(e)}"}
+    return check_request(validated_data)
+
+def check_batch(lines: List[Optional[bytes]]) -> List[Dict[str, Any]]:
+    """Validate a batch of NDJSON records, results in input order.
+
+    Well-formed batches are parsed and type/count-checked in a single
+    pydantic-core pass over one JSON array; a batch with a malformed record
+    falls back to record-by-record parsing to report each error.
+    """
+    if all(line is not None for line in lines):
+        try:
+            requests = container_request_list.validate_json(b"[" + b",".join(lines) + b"]")
+        except ValidationError:
+            pass
+        else:
+            # A line holding more than one value would shift every result after it
+            if len(requests) == len(lines):
+                return [check_request(request) for request in requests]
+    return [check_record(line) for line in lines]
+
+async def ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Split a byte stream into numbered non-empty lines; None marks an oversized line."""
+    buffer = b""
+    line_no = 0
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if skipping:
+                # Tail of an oversized record, already reported
+                skipping = False
+            elif len(line) > MAX_RECORD_BYTES:
+                yield line_no, None
+            elif line.strip():
+                yield line_no, line
+        if len(buffer) > MAX_RECORD_BYTES:
+            if not skipping:
+                yield line_no + 1, None
+                skipping = True
+            buffer = b""
+    if buffer.strip() and not skipping:
+        yield line_no + 1, buffer
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """Streams results while the request body is still being read.
+
+    StreamingResponse normally listens for a client disconnect in parallel,
+    which would consume the request body messages the generator is reading.
+    Here the body stream itself raises on disconnect, so only stream.
+    """
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+async def bulk_results(request: Request) -> AsyncIterator[bytes]:
+    batch: List[Tuple[int, Optional[bytes]]] = []
+
+    async def flush() -> bytes:
+        results = await run_in_threadpool(check_batch, [line for _, line in batch])
+        return b"".join(
+            to_json({"line": line_no, **result}) + b"\n"
+            for (line_no, _), result in zip(batch, results)
+        )
+
+    async for item in ndjson_lines(request.stream()):
+        batch.append(item)
+        if len(batch) >= BULK_BATCH_SIZE:
+            yield await flush()
+            batch = []
+    if batch:
+        yield await flush()
+
 # Create FastAPI app
 app = FastAPI()
 
@@ -27,65 +174,31 @@ async def health_check():
 @app.post("/container-check")
 async def container_check(request: Request):
     try:
-        # Log raw request body
         body = await request.body()
-        print(f"Raw request body: {body.decode()}")
-        
-        # Parse and validate the request
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s request body: %s", request.url.path, body.decode(errors="replace"))
+
+        # Parse and validate the request in one pass
         try:
-            data = await request.json()
-            print(f"Parsed JSON data: {json.dumps(data, indent=2)}")
-            
-            # Convert to our model
-            validated_data = ContainerRequest.model_validate(data)
-            print(f"Validated data: {validated_data.model_dump_json(indent=2)}")
-            
+            validated_data = ContainerRequest.model_validate_json(body)
         except Exception as e:
-            print(f"Validation error: {str(e)}")
+            logger.info("Invalid %s request: %s", request.url.path, e)
             raise HTTPException(status_code=400, detail=f"Invalid request format: {str(e)}")
 
-        # Check if we have at least one container type with count > 0
-        has_containers = any(container.count > 0 for container in validated_data.containers)
-        
-        # Validate container types
-        container_types = {container.type for container in validated_data.containers}
-        valid_types = {ContainerType.HH42, ContainerType.HH24, ContainerType.HH12}
-        invalid_types = container_types - valid_types
-        
-        if invalid_types:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid container types: {', '.join(invalid_types)}. Valid types are: {', '.join(valid_types)}"
-            )
-        
-        if not has_containers:
-            raise HTTPException(
-                status_code=400,
-                detail="At least one container type must have a count greater than 0"
-            )
-
-        # Calculate totals
-        totals = {
-            container.type: container.count
-            for container in validated_data.containers
-        }
-        
-        # Add missing container types with count 0
-        for container_type in valid_types:
-            if container_type not in totals:
-                totals[container_type] = 0
-
-        return {
-            "data": {
-                "valid": True,
-                "message": "Container configuration is valid",
-                "totals": totals,
-                "has_containers": has_containers
-            }
-        }
+        return FastJSONResponse(check_containers(validated_data))
 
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Error processing request: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}") 
\ No newline at end of file
+        logger.exception("Error processing %s request", request.url.path)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.post("/container-check/bulk")
+async def container_check_bulk(request: Request):
+    """Validate NDJSON container requests, one per line, streaming NDJSON results.
+
+    Each output line carries the input line number, a status and either the
+    single endpoint's payload or its error detail. Records are read and
+    answered batch by batch, so memory stays flat for arbitrarily large inputs.
+    """
+    return NDJSONStreamingResponse(bulk_results(request))
\ No newline at end of file
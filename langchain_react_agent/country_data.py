@@ -1,8 +1,19 @@
-from typing import List, Optional, Literal, Union
+from typing import Annotated, Any, Dict, List, Optional, Literal, Union
 from fastapi import FastAPI, HTTPException, Request
-from pydantic import BaseModel, Field, RootModel
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, RootModel, TypeAdapter, ValidationError, field_validator
 from enum import Enum
+import csv
 import json
+import logging
+import os
+
+from langchain_react_agent.port_registry import PortRegistry, normalize
+from langchain_react_agent.port_store import SnapshotRegistry
+from langchain_react_agent.responses import FastJSONResponse
+from langchain_react_agent.singleflight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
 
 # Define models
 class CountryEntry(BaseModel):
@@ -25,13 +36,25 @@ class GetEntryRequest(BaseRequest):
     entry1_id: Optional[str] = None
     entry2_id: Optional[str] = None
 
+# Default and maximum number of ranked search results per page
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 100
+
 class SearchRequest(BaseRequest):
     operation: Literal[Operation.SEARCH]
     search_query: str
+    limit: int = Field(default=DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT)
+    offset: int = Field(default=0, ge=0)
     entry_id: Optional[str] = None
     entry1_id: Optional[str] = None
     entry2_id: Optional[str] = None
 
+    @field_validator("limit", "offset", mode="before")
+    @classmethod
+    def default_when_empty(cls, value: Any, info) -> Any:
+        # Clients send null or 0 for "not set"; both get the default
+        return value or cls.model_fields[info.field_name].default
+
 class SameCountryRequest(BaseRequest):
     operation: Literal[Operation.SAME_COUNTRY]
     entry1_id: str
@@ -39,8 +62,15 @@ class SameCountryRequest(BaseRequest):
     entry_id: Optional[str] = None
     search_query: Optional[str] = None
 
+# The typed requests, told apart by their operation field
+TypedRequest = Annotated[Union[GetEntryRequest, SearchRequest, SameCountryRequest], Field(discriminator="operation")]
+
 # Use RootModel for the discriminated union
-CountryDataRequest = RootModel[Union[GetEntryRequest, SearchRequest, SameCountryRequest]]
+CountryDataRequest = RootModel[TypedRequest]
+
+# Built once: validates a payload straight into the model its operation names,
+# without trying the other request models first
+request_adapter: TypeAdapter[TypedRequest] = TypeAdapter(TypedRequest)
 
 # In-memory storage (replace with a database in production)
 entries: List[CountryEntry] = [
@@ -52,6 +82,110 @@ entries: List[CountryEntry] = [
     CountryEntry(id='DE-HRB', name='Hamburg', country='Germany')
 ]
 
+def load_entries(path: str) -> List[CountryEntry]:
+    """Load port entries from a CSV file with id, name and country columns."""
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            CountryEntry(id=row["id"], name=row["name"], country=row["country"])
+            for row in csv.DictReader(handle)
+        ]
+
+# Indexed registry used by the handlers; PORT_DATA_FILE loads a full dataset.
+# PORT_SNAPSHOT_FILE serves a memory-mapped snapshot instead (see port_store),
+# shared by all workers and reloaded when the file is replaced.
+PORT_DATA_FILE = os.getenv("PORT_DATA_FILE")
+PORT_SNAPSHOT_FILE = os.getenv("PORT_SNAPSHOT_FILE")
+registry: Union[PortRegistry, SnapshotRegistry]
+if PORT_SNAPSHOT_FILE:
+    registry = SnapshotRegistry(PORT_SNAPSHOT_FILE, CountryEntry)
+else:
+    registry = PortRegistry(load_entries(PORT_DATA_FILE) if PORT_DATA_FILE else entries)
+
+# Maximum number of operations accepted by the batch endpoint
+MAX_BATCH_SIZE = 50
+
+class BatchRequest(BaseModel):
+    requests: List[Dict[str, Any]] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+def parse_request(data: Any) -> Union[GetEntryRequest, SearchRequest, SameCountryRequest]:
+    """Build the typed request object from a decoded JSON payload."""
+    # Extract data from root if present
+    if isinstance(data, dict) and 'root' in data:
+        data = data['root']
+    return request_adapter.validate_python(data)
+
+def parse_request_json(body: bytes) -> Union[GetEntryRequest, SearchRequest, SameCountryRequest]:
+    """Build the typed request object from a request body, parsing and validating in one pass."""
+    try:
+        return request_adapter.validate_json(body)
+    except ValidationError:
+        # A {"root": ...} envelope fails the direct pass; unwrap it and validate again
+        data = json.loads(body)
+        if isinstance(data, dict) and 'root' in data:
+            return parse_request(data)
+        raise
+
+def execute(data: Union[GetEntryRequest, SearchRequest, SameCountryRequest]) -> Dict[str, Any]:
+    """Run a validated request against the registry; raises HTTPException on misses."""
+    if isinstance(data, GetEntryRequest):
+        entry = registry.get(data.entry_id)
+        if not entry:
+            raise HTTPException(status_code=404, detail="Entry not found")
+        return {"data": entry}
+
+    elif isinstance(data, SearchRequest):
+        total, results = registry.rank(data.search_query, data.limit, data.offset)
+        return {
+            "data": [
+                {**result.entry.model_dump(), "score": result.score}
+                for result in results
+            ],
+            "total": total,
+            "limit": data.limit,
+            "offset": data.offset
+        }
+
+    elif isinstance(data, SameCountryRequest):
+        entry1 = registry.get(data.entry1_id)
+        entry2 = registry.get(data.entry2_id)
+
+        if not entry1 or not entry2:
+            raise HTTPException(status_code=404, detail="One or both entries not found")
+
+        return {
+            "data": {
+                "same_country": entry1.country == entry2.country,
+                "entry1_country": entry1.country,
+                "entry2_country": entry2.country
+            }
+        }
+
+# Identical searches in flight at the same time share one ranking pass
+search_flight = AsyncSingleFlight()
+
+async def execute_coalesced(data: Union[GetEntryRequest, SearchRequest, SameCountryRequest]) -> Dict[str, Any]:
+    """Run a request from the endpoint, coalescing concurrent identical searches.
+
+    Ranking a large registry is the only operation expensive enough to matter,
+    so it runs off the event loop and concurrent identical queries wait for
+    the same pass; id lookups stay inline.
+    """
+    if not isinstance(data, SearchRequest):
+        return execute(data)
+    key = (normalize(data.search_query), data.limit, data.offset)
+    return await search_flight.do(key, lambda: run_in_threadpool(execute, data))
+
+def execute_item(data: Any) -> Dict[str, Any]:
+    """Parse and run one batch item, reporting failures in the item instead of raising."""
+    try:
+        request_obj = data if isinstance(data, BaseRequest) else parse_request(data)
+    except Exception as e:
+        return {"status": 400, "error": f"Invalid request format: {str(e)}"}
+    try:
+        return {"status": 200, **execute(request_obj)}
+    except HTTPException as he:
+        return {"status": he.status_code, "error": he.detail}
+
 # Create FastAPI app
 app = FastAPI()
 
@@ -62,82 +196,41 @@ async def health_check():
 @app.post("/country-data")
 async def country_data(request: Request):
     try:
-        # Log raw request body
         body = await request.body()
-        print(f"Raw request body: {body.decode()}")
-        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s request body: %s", request.url.path, body.decode(errors="replace"))
+
         # Parse and validate the request
         try:
-            data = await request.json()
-            print(f"Parsed JSON data: {json.dumps(data, indent=2)}")
-            
-            # Extract data from root if present
-            if isinstance(data, dict) and 'root' in data:
-                data = data['root']
-            
-            # Create the appropriate request object based on operation
-            operation = data.get('operation')
-            if not operation:
-                raise ValueError("Operation is required")
-            
-            # Create the appropriate request object directly
-            if operation == 'same_country':
-                request_obj = SameCountryRequest(
-                    operation=Operation.SAME_COUNTRY,
-                    entry1_id=data['entry1_id'],
-                    entry2_id=data['entry2_id']
-                )
-            elif operation == 'get_entry':
-                request_obj = GetEntryRequest(
-                    operation=Operation.GET_ENTRY,
-                    entry_id=data['entry_id']
-                )
-            elif operation == 'search':
-                request_obj = SearchRequest(
-                    operation=Operation.SEARCH,
-                    search_query=data['search_query']
-                )
-            else:
-                raise ValueError(f"Invalid operation: {operation}")
-            
-            # Use the request object directly
-            data = request_obj
-            
+            data = parse_request_json(body)
         except Exception as e:
-            print(f"Validation error: {str(e)}")
+            logger.info("Invalid %s request: %s", request.url.path, e)
             raise HTTPException(status_code=400, detail=f"Invalid request format: {str(e)}")
 
-        if isinstance(data, GetEntryRequest):
-            entry = next((e for e in entries if e.id == data.entry_id), None)
-            if not entry:
-                raise HTTPException(status_code=404, detail="Entry not found")
-            return {"data": entry}
-
-        elif isinstance(data, SearchRequest):
-            search_results = [
-                e for e in entries
-                if data.search_query.lower() in e.name.lower() or
-                   data.search_query.lower() in e.country.lower()
-            ]
-            return {"data": search_results}
-
-        elif isinstance(data, SameCountryRequest):
-            entry1 = next((e for e in entries if e.id == data.entry1_id), None)
-            entry2 = next((e for e in entries if e.id == data.entry2_id), None)
-            
-            if not entry1 or not entry2:
-                raise HTTPException(status_code=404, detail="One or both entries not found")
-            
-            return {
-                "data": {
-                    "same_country": entry1.country == entry2.country,
-                    "entry1_country": entry1.country,
-                    "entry2_country": entry2.country
-                }
-            }
+        return FastJSONResponse(await execute_coalesced(data))
 
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Error processing request: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}") 
\ No newline at end of file
+        logger.exception("Error processing %s request", request.url.path)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.post("/country-data/batch")
+async def country_data_batch(batch: BatchRequest):
+    """Answer several country-data operations in one round trip.
+
+    Results come back in request order; each one carries its own status so a
+    missing port does not fail the rest of the batch.
+    """
+    try:
+        items = batch.requests
+        if any(isinstance(item.get("root", item), dict) and item.get("root", item).get("operation") == "search"
+               for item in items):
+            # Ranked searches would hold up the event loop, as in execute_coalesced
+            results = await run_in_threadpool(lambda: [execute_item(item) for item in items])
+        else:
+            results = [execute_item(item) for item in items]
+        return FastJSONResponse({"data": results})
+    except Exception as e:
+        logger.exception("Error processing batch request")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
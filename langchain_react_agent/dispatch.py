@@ -0,0 +1,206 @@
+"""Transport used by the agent tools to reach the country and container sub-apps.
+
+The sub-apps are usually mounted into the same process as the agent by
+server.py. In that case the tools call the validation logic directly instead
+of going through an HTTP loopback; split deployments keep using HTTP over a
+pooled keep-alive session (sync) or a shared pooled client (async). Both
+modes return the same JSON-compatible payloads.
+
+The agent runs the tool calls of one model step concurrently, so at most
+max_concurrency requests per process are in flight at a time; further
+calls wait for a slot instead of piling up in the connection pool.
+"""
+
+from typing import Any, Dict, List, Optional
+import asyncio
+import threading
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from requests.adapters import HTTPAdapter
+import httpx
+import requests
+
+from langchain_react_agent.container_data import ContainerRequest, check_containers
+from langchain_react_agent.country_data import BaseRequest, execute, execute_item
+from langchain_react_agent.tracing import span
+
+# "auto" dispatches in-process once server.py has mounted the sub-apps here
+DISPATCH_MODES = ("auto", "inprocess", "http")
+
+_local_apps_mounted = False
+
+
+def register_local_apps() -> None:
+    """Record that the sub-apps are served by this process."""
+    global _local_apps_mounted
+    _local_apps_mounted = True
+
+
+class DispatchError(Exception):
+    """A sub-app rejected the request; mirrors the HTTP status and detail."""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(f"{status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {"error": self.detail, "status": self.status_code}
+
+
+def _payload(response: Any) -> Dict[str, Any]:
+    """Decode a requests or httpx response, raising DispatchError on 4xx/5xx."""
+    if response.status_code >= 400:
+        try:
+            detail = response.json().get("detail", response.text)
+        except ValueError:
+            detail = response.text
+        raise DispatchError(response.status_code, detail)
+    return response.json()
+
+
+class ToolDispatcher:
+    """Sends tool requests in-process or over pooled HTTP connections."""
+
+    def __init__(
+        self,
+        country_data_endpoint: str,
+        country_data_batch_endpoint: str,
+        container_check_endpoint: str,
+        verify: bool = True,
+        mode: str = "auto",
+        pool_size: int = 20,
+        timeout: float = 10.0,
+        keepalive_expiry: float = 30.0,
+        max_concurrency: Optional[int] = None,
+    ):
+        if mode not in DISPATCH_MODES:
+            raise ValueError(f"Invalid dispatch mode: {mode}. Valid modes are: {', '.join(DISPATCH_MODES)}")
+        self.country_data_endpoint = country_data_endpoint
+        self.country_data_batch_endpoint = country_data_batch_endpoint
+        self.container_check_endpoint = container_check_endpoint
+        self.verify = verify
+        self.mode = mode
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.keepalive_expiry = keepalive_expiry
+        # Defaults to the pool size, so every request in flight has a connection
+        self.max_concurrency = max_concurrency or pool_size
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._async_slots: Optional[asyncio.Semaphore] = None
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def in_process(self) -> bool:
+        if self.mode == "auto":
+            return _local_apps_mounted
+        return self.mode == "inprocess"
+
+    @property
+    def session(self) -> requests.Session:
+        """Shared keep-alive session for the sync tool path."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    session.verify = self.verify
+                    self._session = session
+        return self._session
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """Shared pooled client for the async tool path, bound to the running loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=self.timeout,
+                verify=self.verify,
+            )
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+            self._async_loop = loop
+        return self._async_client
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    async def aclose(self) -> None:
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+
+    def _post(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with span(f"POST {url}", "http"), self._slots:
+            return _payload(self.session.post(url, json=payload, timeout=self.timeout))
+
+    async def _apost(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        client = self.async_client
+        with span(f"POST {url}", "http"):
+            async with self._async_slots:
+                return _payload(await client.post(url, json=payload))
+
+    @staticmethod
+    def _call(handler, *args) -> Dict[str, Any]:
+        try:
+            with span(handler.__name__, "subapp"):
+                return jsonable_encoder(handler(*args))
+        except HTTPException as he:
+            raise DispatchError(he.status_code, he.detail) from he
+
+    @staticmethod
+    def _run_batch(items: List[BaseRequest]) -> Dict[str, Any]:
+        return {"data": [execute_item(item) for item in items]}
+
+    def country_data(self, request_obj: BaseRequest) -> Dict[str, Any]:
+        if self.in_process:
+            return self._call(execute, request_obj)
+        return self._post(self.country_data_endpoint, request_obj.model_dump(mode="json"))
+
+    def country_data_batch(self, request_objs: List[BaseRequest]) -> Dict[str, Any]:
+        if self.in_process:
+            return self._call(self._run_batch, request_objs)
+        return self._post(
+            self.country_data_batch_endpoint,
+            {"requests": [item.model_dump(mode="json") for item in request_objs]},
+        )
+
+    def container_check(self, request: ContainerRequest) -> Dict[str, Any]:
+        if self.in_process:
+            return self._call(check_containers, request)
+        return self._post(self.container_check_endpoint, request.model_dump(mode="json"))
+
+    # The in-process handlers are plain CPU work, so the async variants only
+    # await when they actually go over the network.
+
+    async def acountry_data(self, request_obj: BaseRequest) -> Dict[str, Any]:
+        if self.in_process:
+            return self._call(execute, request_obj)
+        return await self._apost(self.country_data_endpoint, request_obj.model_dump(mode="json"))
+
+    async def acountry_data_batch(self, request_objs: List[BaseRequest]) -> Dict[str, Any]:
+        if self.in_process:
+            return self._call(self._run_batch, request_objs)
+        return await self._apost(
+            self.country_data_batch_endpoint,
+            {"requests": [item.model_dump(mode="json") for item in request_objs]},
+        )
+
+    async def acontainer_check(self, request: ContainerRequest) -> Dict[str, Any]:
+        if self.in_process:
+            return self._call(check_containers, request)
+        return await self._apost(self.container_check_endpoint, request.model_dump(mode="json"))
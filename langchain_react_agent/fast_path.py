@@ -0,0 +1,199 @@
+"""Deterministic fast path for fully specified booking requests.
+
+Messages like "DE-HAM to US-NYC, 3 HH42, 1 HH12" carry everything the agent
+needs. The pre-router parses the port codes and container counts, validates
+them directly against the port registry and the container rules, and answers
+without an LLM round trip. Anything ambiguous, incomplete or needing a port
+search falls back to the ReAct agent.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence
+import re
+import threading
+
+from fastapi import HTTPException
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from langchain_react_agent import country_data
+from langchain_react_agent.container_data import ContainerCount, ContainerRequest, ContainerType, check_containers
+
+CONTAINER_TYPES = "|".join(t.value for t in ContainerType)
+
+# "DE-HAM" always counts as a port code, "DEHAM" only if it is a known port
+PORT_CODE = re.compile(r"\b([A-Z]{2})(-?)([A-Z0-9]{3})\b")
+DIRECTION = re.compile(r"\b(from|to)\s*$", re.IGNORECASE)
+# A count token: signs, decimals and thousands separators are taken in whole,
+# so "-1", "2.5" or "1,000" are rejected instead of read as 1, 5 or 0
+COUNT = r"(?<![\w.,+-])([-+]?\d+(?:[.,]\d+)*)(?![.,]?\d)"
+COUNT_THEN_TYPE = re.compile(rf"{COUNT}\s*(?:x|×|\*)?\s*({CONTAINER_TYPES})\b", re.IGNORECASE)
+TYPE_THEN_COUNT = re.compile(rf"\b({CONTAINER_TYPES})\s*(?:x|×|\*|:|=)\s*{COUNT}", re.IGNORECASE)
+TYPE_MENTION = re.compile(rf"\b({CONTAINER_TYPES})\b", re.IGNORECASE)
+# Negations, cancellations and questions: the message may not be asking for
+# this booking at all, e.g. "Not DE-HAM to US-NYC, 3 HH42. Please cancel."
+INTENT = re.compile(
+    r"\b(?:not|no|never|without|except|instead|cancel\w*|abort|delete|remove|stop|"
+    r"what|which|why|how|whether)\b|n't\b|\?",
+    re.IGNORECASE,
+)
+# Larger counts are more likely a typo or a pasted reference than an order
+MAX_COUNT = 999
+
+
+class ParsedBooking(NamedTuple):
+    origin: str
+    destination: str
+    containers: List[ContainerCount]
+
+
+class FastPathStats:
+    """Counts agent turns by whether the fast path answered them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.fast_path = 0
+        self.fallbacks: Dict[str, int] = {}
+
+    def record(self, fallback_reason: Optional[str]) -> None:
+        with self._lock:
+            self.turns += 1
+            if fallback_reason is None:
+                self.fast_path += 1
+            else:
+                self.fallbacks[fallback_reason] = self.fallbacks.get(fallback_reason, 0) + 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "fast_path": self.fast_path,
+                "fast_path_ratio": self.fast_path / self.turns if self.turns else 0.0,
+                "fallbacks": dict(self.fallbacks),
+            }
+
+
+stats = FastPathStats()
+
+
+class Fallback(Exception):
+    """The message can't be answered deterministically; reason says why."""
+
+
+def _port_codes(text: str) -> List[str]:
+    origin = destination = None
+    ordered = []
+    for match in PORT_CODE.finditer(text):
+        prefix, dash, suffix = match.groups()
+        code = f"{prefix}-{suffix}"
+        if not dash and code not in country_data.registry:
+            continue
+        if code in ordered:
+            continue
+        direction = DIRECTION.search(text[:match.start()])
+        if direction and direction.group(1).lower() == "from":
+            if origin is not None:
+                raise Fallback("port_direction")
+            origin = code
+        elif direction and direction.group(1).lower() == "to":
+            if destination is not None:
+                # "to US-NYC and to DE-HAM" names no origin
+                raise Fallback("port_direction")
+            destination = code
+        ordered.append(code)
+    if len(ordered) != 2:
+        raise Fallback("port_count")
+    # Explicit "from"/"to" wins, otherwise the first code is the origin
+    if origin is None and destination is None:
+        origin, destination = ordered
+    elif origin is None:
+        origin = next(code for code in ordered if code != destination)
+    elif destination is None:
+        destination = next(code for code in ordered if code != origin)
+    if origin == destination:
+        raise Fallback("port_direction")
+    return [origin, destination]
+
+
+def _count(token: str) -> int:
+    """A count the fast path can trust: a plain integer from 1 to MAX_COUNT."""
+    if not token.isdigit() or not 0 < int(token) <= MAX_COUNT:
+        raise Fallback("container_count")
+    return int(token)
+
+
+def _containers(text: str) -> List[ContainerCount]:
+    counts: Dict[ContainerType, int] = {}
+    spans = []
+    for pattern, count_group, type_group in ((COUNT_THEN_TYPE, 1, 2), (TYPE_THEN_COUNT, 2, 1)):
+        for match in pattern.finditer(text):
+            if any(match.start() < end and start < match.end() for start, end in spans):
+                # A type with a count on both sides ("12 HH42 x 3"), or a
+                # number that could belong to either of two types
+                raise Fallback("container_repeated")
+            container_type = ContainerType(match.group(type_group).upper())
+            if container_type in counts:
+                raise Fallback("container_repeated")
+            counts[container_type] = _count(match.group(count_group))
+            spans.append(match.span())
+    if not counts:
+        raise Fallback("container_missing")
+    if len(TYPE_MENTION.findall(text)) != len(counts):
+        # A type mentioned without a count we could read
+        raise Fallback("container_ambiguous")
+    return [ContainerCount(type=t, count=c) for t, c in counts.items()]
+
+
+def parse(text: str) -> ParsedBooking:
+    """Extract a complete booking from a message or raise Fallback."""
+    if INTENT.search(text):
+        raise Fallback("intent")
+    origin, destination = _port_codes(text)
+    return ParsedBooking(origin, destination, _containers(text))
+
+
+def answer(text: str) -> str:
+    """Validate a fully specified booking and return the reply, or raise Fallback."""
+    booking = parse(text)
+    registry = country_data.registry
+    origin = registry.get(booking.origin)
+    destination = registry.get(booking.destination)
+    if origin is None or destination is None:
+        # Unknown codes need a port search, which is the agent's job
+        raise Fallback("port_unknown")
+
+    route = (
+        f"origin {origin.id} ({origin.name}, {origin.country}) and "
+        f"destination {destination.id} ({destination.name}, {destination.country})"
+    )
+    if origin.country == destination.country:
+        return (
+            f"The {route} are in the same country. "
+            "Please provide an origin and a destination port in different countries."
+        )
+
+    try:
+        result = check_containers(ContainerRequest(containers=booking.containers))
+    except HTTPException as he:
+        return f"The container information is not valid: {he.detail}. Please provide the correct container information."
+    totals = result["data"]["totals"]
+    containers = ", ".join(
+        f"{totals[t]} x {t.value}" for t in ContainerType if totals[t] > 0
+    )
+    return f"Your booking is valid: {route}, containers: {containers}."
+
+
+def try_answer(messages: Sequence[BaseMessage]) -> Optional[AIMessage]:
+    """Answer the latest human message deterministically, or return None."""
+    if not messages or not isinstance(messages[-1], HumanMessage):
+        return None
+    content = messages[-1].content
+    if not isinstance(content, str):
+        stats.record("non_text")
+        return None
+    try:
+        reply = answer(content)
+    except Fallback as fallback:
+        stats.record(str(fallback))
+        return None
+    stats.record(None)
+    return AIMessage(content=reply, additional_kwargs={"fast_path": True})
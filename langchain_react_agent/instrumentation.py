@@ -0,0 +1,337 @@
+"""Metrics and structured logging for the server.
+
+Metrics keeps latency histograms and counters in memory: per HTTP route
+(MetricsMiddleware), per tool call and per LLM call (MetricsCallbackHandler,
+attached to the agent runs). Values owned by other components, such as
+token counts and cache hit ratios, are read from collectors when the
+metrics are rendered, so the hot path only pays for the observations.
+Metrics are per process; in production mode each worker reports its own.
+
+configure_logging() sets up leveled logging, as plain text or one JSON
+object per line. Request and response bodies are only logged at DEBUG.
+"""
+
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+import json
+import logging
+import re
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; covers in-process tool calls up to slow LLM responses
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One count per bucket plus the +Inf overflow
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside the bucket it falls in."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """Thread-safe registry of histograms, counters and collected gauges."""
+
+    def __init__(self, prefix: str = "agent", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def add_collector(self, name: str, collect: Callable[[], Dict[str, Any]]) -> None:
+        """Report the numeric values of collect() as `<prefix>_<name>_<key>` gauges."""
+        self._collectors[name] = collect
+
+    def _collected(self) -> Dict[str, Dict[str, float]]:
+        gauges = {}
+        for name, collect in self._collectors.items():
+            try:
+                values = collect()
+            except Exception:
+                logging.getLogger(__name__).exception("Metrics collector %s failed", name)
+                continue
+            gauges[name] = {
+                key: value for key, value in _flatten(values)
+                if isinstance(value, (int, float)) and not isinstance(value, bool)
+            }
+        return gauges
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Everything as JSON: latency summaries, counters and collected values."""
+        uptime = time.time() - self.started
+        with self._lock:
+            latencies = {
+                name: [
+                    {
+                        **dict(key),
+                        "count": h.count,
+                        "rate_per_s": round(h.count / uptime, 3) if uptime else 0.0,
+                        "mean_ms": round(h.sum / h.count * 1000, 2) if h.count else 0.0,
+                        "p50_ms": round(h.quantile(0.5) * 1000, 2),
+                        "p95_ms": round(h.quantile(0.95) * 1000, 2),
+                        "p99_ms": round(h.quantile(0.99) * 1000, 2),
+                    }
+                    for key, h in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+            counters = {
+                name: [{**dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+        return {
+            "uptime_seconds": round(uptime, 1),
+            "latency": latencies,
+            "counters": counters,
+            "gauges": self._collected(),
+        }
+
+    def render_prometheus(self) -> str:
+        """Text exposition format, for scraping by Prometheus."""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for key, h in series.items():
+                    cumulative = 0
+                    for bound, bucket_count in zip(self.buckets + (float("inf"),), h.counts):
+                        cumulative += bucket_count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{metric}_bucket{_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{metric}_sum{_labels(key)} {h.sum}")
+                    lines.append(f"{metric}_count{_labels(key)} {h.count}")
+            for name, series in sorted(self._counters.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                lines.extend(f"{metric}{_labels(key)} {value}" for key, value in series.items())
+        for name, values in sorted(self._collected().items()):
+            for key, value in sorted(values.items()):
+                metric = f"{self.prefix}_{name}_{key}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key: Labels) -> str:
+    if not key:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in key
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _flatten(values: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, Any]]:
+    for key, value in values.items():
+        name = re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}{key}")
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}_")
+        else:
+            yield name, value
+
+
+def hit_ratio(hits: float, misses: float) -> float:
+    return round(hits / (hits + misses), 4) if hits + misses else 0.0
+
+
+class MetricsMiddleware:
+    """Records latency and outcome of every HTTP request, per route template.
+
+    Routes are labelled by their path template (with the mount prefix), so
+    path parameters don't create a series per value; unmatched paths share
+    one label.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        root_path = scope.get("root_path", "")
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = f"{scope['method']} {_route_template(scope, root_path)}"
+            self.metrics.observe("http_request_duration_seconds", elapsed, route=route)
+            self.metrics.inc("http_requests_total", route=route, status=f"{status // 100}xx")
+
+
+def _route_template(scope: Scope, root_path: str) -> str:
+    # The routers store the matched route in the (shared) scope; mounts
+    # extend root_path with their prefix
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "unmatched"
+    return scope.get("root_path", "")[len(root_path):] + path
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times tool and LLM calls of agent runs and counts LLM tokens.
+
+    A call that never gets its end callback, e.g. one cancelled when a
+    progress stream is closed, is forgotten once it is `max_run_seconds`
+    old; the check runs whenever a new agent run starts.
+    """
+
+    # Cheap bookkeeping only, so it is safe to call on the event loop
+    run_inline = True
+
+    def __init__(self, metrics: Metrics, max_run_seconds: float = 600.0):
+        self.metrics = metrics
+        self.max_run_seconds = max_run_seconds
+        self._started: Dict[UUID, Tuple[str, float]] = {}
+
+    def _start(self, run_id: UUID, name: str) -> None:
+        self._started[run_id] = (name, time.perf_counter())
+
+    def _drop_stale(self) -> None:
+        cutoff = time.perf_counter() - self.max_run_seconds
+        for run_id, (_, start) in list(self._started.items()):
+            if start < cutoff:
+                self._started.pop(run_id, None)
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                       **kwargs: Any) -> None:
+        if parent_run_id is None:
+            self._drop_stale()
+
+    def _finish(self, run_id: UUID, kind: str, outcome: str) -> Optional[str]:
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return None
+        name, start = started
+        self.metrics.observe(f"{kind}_call_duration_seconds", time.perf_counter() - start, **{kind: name})
+        self.metrics.inc(f"{kind}_calls_total", **{kind: name, "outcome": outcome})
+        return name
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        model = (metadata or {}).get("ls_model_name") or (kwargs.get("invocation_params") or {}).get("model") or "llm"
+        self._start(run_id, model)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        model = self._finish(run_id, "llm", "ok")
+        if model is None:
+            return
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.metrics.inc("llm_tokens_total", usage.get("input_tokens", 0), llm=model, kind="input")
+                    self.metrics.inc("llm_tokens_total", usage.get("output_tokens", 0), llm=model, kind="output")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "llm", "error")
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, (serialized or {}).get("name") or kwargs.get("name") or "tool")
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        # The tools report backend failures as an error payload instead of raising
+        content = getattr(output, "content", output)
+        failed = getattr(output, "status", None) == "error" or (
+            isinstance(content, dict) and "error" in content
+        ) or (isinstance(content, str) and content.startswith('{"error"'))
+        self._finish(run_id, "tool", "error" if failed else "ok")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "tool", "error")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any `extra=` fields."""
+
+    # Attributes every LogRecord has; anything else came in through extra=
+    _STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items()
+            if key not in self._STANDARD and not key.startswith("_")
+        )
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = "INFO", fmt: str = "text") -> None:
+    """Send application logs to stderr at `level`, as "text" or "json" lines."""
+    handler = logging.StreamHandler()
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    package = logging.getLogger("langchain_react_agent")
+    package.handlers[:] = [handler]
+    package.setLevel(level.upper())
+    # Our records are handled here; don't repeat them through the root logger
+    package.propagate = False
@@ -0,0 +1,99 @@
+"""ChatOpenAI with backoff on rate limits and transient API failures.
+
+Kept out of agent.py because langchain_openai and the OpenAI SDK take
+well over a second to import; agent.get_agent() imports this module when
+it builds the agent.
+"""
+
+from typing import Optional
+import asyncio
+import time
+
+from langchain_openai import ChatOpenAI
+from openai import APIConnectionError, APIStatusError, InternalServerError, RateLimitError
+from pydantic import Field
+
+from langchain_react_agent.admission import UpstreamRetry
+
+RETRYABLE_LLM_ERRORS = (RateLimitError, InternalServerError, APIConnectionError)
+
+
+def retry_delay(retry: UpstreamRetry, attempt: int, e: Exception) -> Optional[float]:
+    """Backoff before the next attempt, or None when the error should surface."""
+    if getattr(e, "code", None) == "insufficient_quota":
+        # Out of credit rather than rate limited; retrying won't help
+        return None
+    retry_after = None
+    if isinstance(e, APIStatusError):
+        try:
+            retry_after = float(e.response.headers.get("retry-after", ""))
+        except ValueError:
+            pass
+    return retry.next_delay(attempt, retry_after)
+
+
+class RetryingChatOpenAI(ChatOpenAI):
+    """ChatOpenAI that backs off and retries on 429s and transient API errors.
+
+    Retries honour Retry-After and are counted in `retry`; build it with
+    max_retries=0 so the OpenAI client doesn't retry as well. Streams are
+    only retried until the first chunk has been yielded.
+    """
+
+    retry: UpstreamRetry = Field(default_factory=UpstreamRetry, exclude=True)
+
+    def _generate(self, *args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return super()._generate(*args, **kwargs)
+            except RETRYABLE_LLM_ERRORS as e:
+                delay = retry_delay(self.retry, attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+
+    async def _agenerate(self, *args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return await super()._agenerate(*args, **kwargs)
+            except RETRYABLE_LLM_ERRORS as e:
+                delay = retry_delay(self.retry, attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    def _stream(self, *args, **kwargs):
+        attempt = 0
+        while True:
+            started = False
+            try:
+                for chunk in super()._stream(*args, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except RETRYABLE_LLM_ERRORS as e:
+                delay = None if started else retry_delay(self.retry, attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+
+    async def _astream(self, *args, **kwargs):
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async for chunk in super()._astream(*args, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except RETRYABLE_LLM_ERRORS as e:
+                delay = None if started else retry_delay(self.retry, attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
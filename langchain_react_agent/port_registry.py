@@ -0,0 +1,230 @@
+from collections import Counter
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+import heapq
+import math
+
+if TYPE_CHECKING:
+    from langchain_react_agent.country_data import CountryEntry
+
+# Length of the n-grams used for candidate pruning and similarity
+GRAM_SIZE = 3
+
+# Ranked results scoring below this similarity are dropped
+MIN_SCORE = 0.3
+
+
+def normalize(value: str) -> str:
+    """Normalize a name, country or code for case-insensitive matching."""
+    return " ".join(value.casefold().split())
+
+
+def trigrams(value: str) -> Set[str]:
+    """Return the set of GRAM_SIZE-grams of an already normalized string."""
+    if len(value) < GRAM_SIZE:
+        return set()
+    return {value[i:i + GRAM_SIZE] for i in range(len(value) - GRAM_SIZE + 1)}
+
+
+def padded_trigrams(value: str) -> Set[str]:
+    """Trigrams of a normalized string padded so prefixes and short words match."""
+    return trigrams(" " * (GRAM_SIZE - 1) + value + " ")
+
+
+class SearchResult(NamedTuple):
+    entry: "CountryEntry"
+    score: float
+
+
+class PortRegistry:
+    """Indexed, in-memory port registry.
+
+    Keeps a hash index on the entry id, an inverted index from normalized
+    country to entries, a normalized-name index and a trigram index over the
+    normalized names, countries and codes. get_entry and same_country are
+    O(1); search and rank only look at the keys sharing trigrams with the
+    query instead of scanning every entry.
+    """
+
+    def __init__(self, entries: Iterable["CountryEntry"] = ()):
+        self._by_id: Dict[str, "CountryEntry"] = {}
+        self._position: Dict[str, int] = {}
+        self._by_country: Dict[str, List["CountryEntry"]] = {}
+        self._by_name: Dict[str, List["CountryEntry"]] = {}
+        # Normalized key (name, country or code) -> ids of the entries using it
+        self._key_entries: Dict[str, Set[str]] = {}
+        self._key_gram_count: Dict[str, int] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._next_position = 0
+        self._listeners: List[Callable[[], None]] = []
+        for entry in entries:
+            self.add(entry)
+
+    def subscribe(self, listener: Callable[[], None]) -> None:
+        """Call listener whenever an entry is added, replaced or removed."""
+        self._listeners.append(listener)
+
+    def _changed(self) -> None:
+        for listener in self._listeners:
+            listener()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, entry_id: str) -> bool:
+        return entry_id in self._by_id
+
+    def __iter__(self):
+        return iter(self.entries())
+
+    def entries(self) -> List["CountryEntry"]:
+        """Return all entries in insertion order."""
+        return sorted(self._by_id.values(), key=lambda e: self._position[e.id])
+
+    @staticmethod
+    def _keys(entry: "CountryEntry") -> Set[str]:
+        return {normalize(entry.name), normalize(entry.country), normalize(entry.id)}
+
+    def add(self, entry: "CountryEntry") -> None:
+        """Add an entry, replacing any existing entry with the same id."""
+        if entry.id in self._by_id:
+            self.remove(entry.id)
+        self._by_id[entry.id] = entry
+        self._position[entry.id] = self._next_position
+        self._next_position += 1
+
+        self._by_country.setdefault(normalize(entry.country), []).append(entry)
+        self._by_name.setdefault(normalize(entry.name), []).append(entry)
+
+        for key in self._keys(entry):
+            if key not in self._key_entries:
+                self._key_entries[key] = set()
+                grams = padded_trigrams(key)
+                self._key_gram_count[key] = len(grams)
+                for gram in grams:
+                    self._grams.setdefault(gram, set()).add(key)
+            self._key_entries[key].add(entry.id)
+        self._changed()
+
+    def remove(self, entry_id: str) -> Optional["CountryEntry"]:
+        """Remove an entry by id and return it, or None if it is unknown."""
+        entry = self._by_id.pop(entry_id, None)
+        if entry is None:
+            return None
+        del self._position[entry_id]
+
+        self._discard(self._by_country, normalize(entry.country), entry_id)
+        self._discard(self._by_name, normalize(entry.name), entry_id)
+
+        for key in self._keys(entry):
+            ids = self._key_entries[key]
+            ids.discard(entry_id)
+            if ids:
+                continue
+            del self._key_entries[key]
+            del self._key_gram_count[key]
+            for gram in padded_trigrams(key):
+                keys = self._grams[gram]
+                keys.discard(key)
+                if not keys:
+                    del self._grams[gram]
+        self._changed()
+        return entry
+
+    @staticmethod
+    def _discard(index: Dict[str, List["CountryEntry"]], key: str, entry_id: str) -> None:
+        bucket = [e for e in index.get(key, []) if e.id != entry_id]
+        if bucket:
+            index[key] = bucket
+        else:
+            index.pop(key, None)
+
+    def get(self, entry_id: str) -> Optional["CountryEntry"]:
+        """Look up an entry by id."""
+        return self._by_id.get(entry_id)
+
+    def by_country(self, country: str) -> List["CountryEntry"]:
+        """Return all entries of a country (case-insensitive)."""
+        return list(self._by_country.get(normalize(country), []))
+
+    def same_country(self, entry1_id: str, entry2_id: str) -> Optional[bool]:
+        """Return whether two entries share a country, or None if one is unknown."""
+        entry1 = self._by_id.get(entry1_id)
+        entry2 = self._by_id.get(entry2_id)
+        if entry1 is None or entry2 is None:
+            return None
+        return entry1.country == entry2.country
+
+    def _substring_keys(self, query: str) -> Iterable[str]:
+        grams = trigrams(query)
+        if not grams:
+            # Queries shorter than a gram can't use the postings
+            return [key for key in self._key_entries if query in key]
+        postings = sorted((self._grams.get(g, set()) for g in grams), key=len)
+        candidates = set(postings[0])
+        for keys in postings[1:]:
+            candidates &= keys
+            if not candidates:
+                break
+        return [key for key in candidates if query in key]
+
+    def search(self, query: str) -> List["CountryEntry"]:
+        """Case-insensitive substring search on name and country."""
+        query = normalize(query)
+        matches: Dict[str, "CountryEntry"] = {}
+        for key in self._substring_keys(query):
+            for entry in self._by_name.get(key, ()):
+                matches[entry.id] = entry
+            for entry in self._by_country.get(key, ()):
+                matches[entry.id] = entry
+        return sorted(matches.values(), key=lambda e: self._position[e.id])
+
+    def rank(self, query: str, limit: int, offset: int = 0) -> Tuple[int, List[SearchResult]]:
+        """Typo-tolerant search ranked by trigram similarity.
+
+        Every name, country and code sharing a trigram with the query is
+        scored by how much of the query it covers blended with its Jaccard
+        similarity, so exact and prefix matches rank above partial ones. An
+        entry scores as its best key. Returns the number of matches above
+        MIN_SCORE and the requested page, best first.
+        """
+        query_grams = padded_trigrams(normalize(query))
+        if not query_grams:
+            return 0, []
+        size = len(query_grams)
+        # The score never exceeds count / size, so a key has to share at least
+        # min_shared grams and must show up in one of the size - min_shared + 1
+        # shortest postings; the longer ones are only probed for candidates.
+        min_shared = max(1, math.ceil(MIN_SCORE * size))
+        postings = sorted((self._grams.get(g, set()) for g in query_grams), key=len)
+        split = size - min_shared + 1
+        shared: Counter = Counter()
+        for keys in postings[:split]:
+            shared.update(keys)
+        for keys in postings[split:]:
+            for key in shared:
+                if key in keys:
+                    shared[key] += 1
+
+        best: Dict[str, float] = {}
+        for key, count in shared.items():
+            if count < min_shared:
+                continue
+            coverage = count / size
+            jaccard = count / (size + self._key_gram_count[key] - count)
+            score = 0.6 * coverage + 0.4 * jaccard
+            if score < MIN_SCORE:
+                continue
+            for entry_id in self._key_entries[key]:
+                if score > best.get(entry_id, 0.0):
+                    best[entry_id] = score
+
+        top = heapq.nsmallest(
+            offset + limit,
+            best.items(),
+            key=lambda item: (-item[1], self._position[item[0]]),
+        )
+        page = [
+            SearchResult(self._by_id[entry_id], round(score, 4))
+            for entry_id, score in top[offset:]
+        ]
+        return len(best), page
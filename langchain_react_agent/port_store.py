@@ -0,0 +1,466 @@
+"""Compact, memory-mapped snapshots of the port registry.
+
+A snapshot file holds the registry column by column: ids and names as
+UTF-8 blobs with u32 offset arrays, countries interned once and referenced
+by index, a hash table on the ids, and the trigram index as array-backed
+postings. Opening a snapshot is an mmap, not a parse, and every worker
+process that opens the same file shares one physical copy through the page
+cache. Entries are only materialized for the rows a request returns.
+
+Snapshots are immutable. SnapshotRegistry serves the current file and
+switches to a new one once it has been atomically replaced on disk, so the
+dataset can be reloaded without restarting the workers.
+
+    python -m langchain_react_agent.port_store ports.csv ports.snapshot
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import heapq
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from langchain_react_agent.port_registry import (
+    MIN_SCORE,
+    SearchResult,
+    normalize,
+    padded_trigrams,
+    trigrams,
+)
+
+MAGIC = b"PORTSNAP"
+VERSION = 1
+# magic, version, header length; the JSON header lists the sections. Arrays
+# are stored in native byte order and mapped as they are.
+PREAMBLE = struct.Struct("<8sII")
+ALIGN = 8
+
+# Posting kinds: which field of the entry a normalized key came from
+KIND_NAME, KIND_COUNTRY, KIND_CODE = 1, 2, 4
+
+EMPTY = 0
+
+
+def _slot_count(size: int) -> int:
+    """Power of two at least twice the key count, for short probe sequences."""
+    return 1 << max(3, (2 * size - 1).bit_length())
+
+
+def _hash(key: bytes) -> int:
+    return zlib.crc32(key)
+
+
+class _Blob:
+    """Builder for a string column: a UTF-8 blob plus n + 1 offsets."""
+
+    def __init__(self):
+        self.offsets = [0]
+        self.parts: List[bytes] = []
+
+    def append(self, value: str) -> None:
+        data = value.encode("utf-8")
+        self.parts.append(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+
+
+def _hash_slots(keys: Sequence[bytes]) -> List[int]:
+    """Open-addressing table of key index + 1 (0 is empty), linear probing."""
+    slots = [EMPTY] * _slot_count(len(keys))
+    mask = len(slots) - 1
+    for index, key in enumerate(keys):
+        slot = _hash(key) & mask
+        while slots[slot] != EMPTY:
+            slot = (slot + 1) & mask
+        slots[slot] = index + 1
+    return slots
+
+
+def _postings(lists: Sequence[Sequence[int]]) -> Tuple[List[int], List[int]]:
+    """Flatten per-key lists into n + 1 offsets and one values array."""
+    offsets = [0]
+    values: List[int] = []
+    for items in lists:
+        values.extend(items)
+        offsets.append(len(values))
+    return offsets, values
+
+
+def write_snapshot(entries: Iterable[Any], path: str) -> int:
+    """Write entries (objects with id, name and country) to a snapshot file.
+
+    Later entries replace earlier ones with the same id, as in PortRegistry.
+    The file is written next to `path` and moved into place atomically, so
+    readers see either the old or the new snapshot. Returns the entry count.
+    """
+    latest: Dict[str, Any] = {}
+    for entry in entries:
+        latest.pop(entry.id, None)
+        latest[entry.id] = entry
+    rows = list(latest.values())
+
+    ids, names, countries = _Blob(), _Blob(), _Blob()
+    country_index: Dict[str, int] = {}
+    entry_country = []
+    for row in rows:
+        ids.append(row.id)
+        names.append(row.name)
+        if row.country not in country_index:
+            country_index[row.country] = len(country_index)
+            countries.append(row.country)
+        entry_country.append(country_index[row.country])
+
+    # Normalized keys with their entries and the field each came from
+    key_index: Dict[str, int] = {}
+    key_postings: List[List[int]] = []
+    key_kinds: List[List[int]] = []
+    for position, row in enumerate(rows):
+        kinds: Dict[str, int] = {}
+        for kind, value in ((KIND_NAME, row.name), (KIND_COUNTRY, row.country), (KIND_CODE, row.id)):
+            key = normalize(value)
+            kinds[key] = kinds.get(key, 0) | kind
+        for key, kind in kinds.items():
+            if key not in key_index:
+                key_index[key] = len(key_index)
+                key_postings.append([])
+                key_kinds.append([])
+            key_postings[key_index[key]].append(position)
+            key_kinds[key_index[key]].append(kind)
+
+    keys = _Blob()
+    key_gram_count = []
+    gram_keys: Dict[str, List[int]] = {}
+    for key, index in key_index.items():
+        keys.append(key)
+        grams = padded_trigrams(key)
+        key_gram_count.append(len(grams))
+        for gram in grams:
+            gram_keys.setdefault(gram, []).append(index)
+
+    grams = _Blob()
+    gram_lists = []
+    for gram, key_list in gram_keys.items():
+        grams.append(gram)
+        gram_lists.append(sorted(key_list))
+
+    key_post_offsets, key_post = _postings(key_postings)
+    gram_post_offsets, gram_post = _postings(gram_lists)
+    sections: List[Tuple[str, str, Any]] = [
+        ("id_offsets", "I", ids.offsets),
+        ("id_blob", "B", b"".join(ids.parts)),
+        ("id_slots", "I", _hash_slots(ids.parts)),
+        ("name_offsets", "I", names.offsets),
+        ("name_blob", "B", b"".join(names.parts)),
+        ("entry_country", "I", entry_country),
+        ("country_offsets", "I", countries.offsets),
+        ("country_blob", "B", b"".join(countries.parts)),
+        ("key_offsets", "I", keys.offsets),
+        ("key_blob", "B", b"".join(keys.parts)),
+        ("key_gram_count", "I", key_gram_count),
+        ("key_post_offsets", "I", key_post_offsets),
+        ("key_post", "I", key_post),
+        ("key_post_kind", "B", [kind for kinds in key_kinds for kind in kinds]),
+        ("gram_offsets", "I", grams.offsets),
+        ("gram_blob", "B", b"".join(grams.parts)),
+        ("gram_slots", "I", _hash_slots(grams.parts)),
+        ("gram_post_offsets", "I", gram_post_offsets),
+        ("gram_post", "I", gram_post),
+    ]
+
+    payloads = []
+    layout = {}
+    offset = 0
+    for name, fmt, values in sections:
+        data = values if isinstance(values, bytes) else array(fmt, values).tobytes()
+        layout[name] = [fmt, offset, len(data)]
+        payloads.append(data + b"\0" * (-len(data) % ALIGN))
+        offset += len(payloads[-1])
+    header = json.dumps({"count": len(rows), "byteorder": sys.byteorder, "sections": layout}).encode()
+    header += b" " * (-(PREAMBLE.size + len(header)) % ALIGN)
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as handle:
+        handle.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        handle.write(header)
+        for data in payloads:
+            handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+class PortSnapshot:
+    """Read-only port registry backed by a memory-mapped snapshot file.
+
+    Offers the read side of PortRegistry (get, same_country, by_country,
+    search, rank) with the same results and ordering.
+    """
+
+    def __init__(self, path: str, entry_type: Callable[..., Any]):
+        self.path = path
+        self.entry_type = entry_type
+        with open(path, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            self.identity = _identity(os.fstat(handle.fileno()))
+        magic, version, header_size = PREAMBLE.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} port snapshot")
+        header = json.loads(self._mmap[PREAMBLE.size:PREAMBLE.size + header_size])
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was written on a {header['byteorder']}-endian machine")
+        base = PREAMBLE.size + header_size
+        view = memoryview(self._mmap)
+        self._count = header["count"]
+        for name, (fmt, offset, size) in header["sections"].items():
+            section = view[base + offset:base + offset + size]
+            setattr(self, f"_{name}", section.cast(fmt) if fmt != "B" else section)
+
+        # Countries are few; map their normalized names to the interned indexes
+        self._countries = [
+            self._string(self._country_blob, self._country_offsets, i)
+            for i in range(len(self._country_offsets) - 1)
+        ]
+        self._country_lookup: Dict[str, List[int]] = {}
+        for index, country in enumerate(self._countries):
+            self._country_lookup.setdefault(normalize(country), []).append(index)
+
+    @staticmethod
+    def _string(blob: memoryview, offsets: memoryview, index: int) -> str:
+        return str(blob[offsets[index]:offsets[index + 1]], "utf-8")
+
+    @staticmethod
+    def _find(slots: memoryview, blob: memoryview, offsets: memoryview, key: bytes) -> int:
+        """Index of key in a hashed string column, or -1."""
+        mask = len(slots) - 1
+        slot = _hash(key) & mask
+        while True:
+            value = slots[slot]
+            if value == EMPTY:
+                return -1
+            index = value - 1
+            if blob[offsets[index]:offsets[index + 1]] == key:
+                return index
+            slot = (slot + 1) & mask
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, entry_id: str) -> bool:
+        return self._position(entry_id) >= 0
+
+    def __iter__(self):
+        return iter(self.entries())
+
+    def _position(self, entry_id: str) -> int:
+        return self._find(self._id_slots, self._id_blob, self._id_offsets, entry_id.encode("utf-8"))
+
+    def _entry(self, position: int) -> Any:
+        return self.entry_type(
+            id=self._string(self._id_blob, self._id_offsets, position),
+            name=self._string(self._name_blob, self._name_offsets, position),
+            country=self._countries[self._entry_country[position]],
+        )
+
+    def entries(self) -> List[Any]:
+        """Return all entries in insertion order."""
+        return [self._entry(position) for position in range(self._count)]
+
+    def get(self, entry_id: str) -> Optional[Any]:
+        """Look up an entry by id."""
+        position = self._position(entry_id)
+        return self._entry(position) if position >= 0 else None
+
+    def by_country(self, country: str) -> List[Any]:
+        """Return all entries of a country (case-insensitive)."""
+        wanted = set(self._country_lookup.get(normalize(country), ()))
+        if not wanted:
+            return []
+        return [
+            self._entry(position)
+            for position in range(self._count)
+            if self._entry_country[position] in wanted
+        ]
+
+    def same_country(self, entry1_id: str, entry2_id: str) -> Optional[bool]:
+        """Return whether two entries share a country, or None if one is unknown."""
+        position1 = self._position(entry1_id)
+        position2 = self._position(entry2_id)
+        if position1 < 0 or position2 < 0:
+            return None
+        return self._entry_country[position1] == self._entry_country[position2]
+
+    def _gram_keys(self, gram: str) -> memoryview:
+        index = self._find(self._gram_slots, self._gram_blob, self._gram_offsets, gram.encode("utf-8"))
+        if index < 0:
+            return self._gram_post[0:0]
+        return self._gram_post[self._gram_post_offsets[index]:self._gram_post_offsets[index + 1]]
+
+    def _key(self, index: int) -> str:
+        return self._string(self._key_blob, self._key_offsets, index)
+
+    def search(self, query: str) -> List[Any]:
+        """Case-insensitive substring search on name and country."""
+        query = normalize(query)
+        grams = trigrams(query)
+        if grams:
+            postings = sorted((self._gram_keys(g) for g in grams), key=len)
+            candidates = set(postings[0])
+            for keys in postings[1:]:
+                candidates &= set(keys)
+                if not candidates:
+                    break
+        else:
+            # Queries shorter than a gram can't use the postings
+            candidates = range(len(self._key_offsets) - 1)
+        matches = set()
+        for key in candidates:
+            if query not in self._key(key):
+                continue
+            start, end = self._key_post_offsets[key], self._key_post_offsets[key + 1]
+            for i in range(start, end):
+                if self._key_post_kind[i] & (KIND_NAME | KIND_COUNTRY):
+                    matches.add(self._key_post[i])
+        return [self._entry(position) for position in sorted(matches)]
+
+    def rank(self, query: str, limit: int, offset: int = 0) -> Tuple[int, List[SearchResult]]:
+        """Typo-tolerant search ranked by trigram similarity, as PortRegistry.rank."""
+        query_grams = padded_trigrams(normalize(query))
+        if not query_grams:
+            return 0, []
+        size = len(query_grams)
+        min_shared = max(1, math.ceil(MIN_SCORE * size))
+        postings = sorted((self._gram_keys(g) for g in query_grams), key=len)
+        split = size - min_shared + 1
+        shared: Counter = Counter()
+        for keys in postings[:split]:
+            shared.update(keys)
+        # Postings are sorted, so the long ones are probed by bisection
+        for keys in postings[split:]:
+            for key in shared:
+                i = bisect_left(keys, key)
+                if i < len(keys) and keys[i] == key:
+                    shared[key] += 1
+
+        best: Dict[int, float] = {}
+        for key, count in shared.items():
+            if count < min_shared:
+                continue
+            coverage = count / size
+            jaccard = count / (size + self._key_gram_count[key] - count)
+            score = 0.6 * coverage + 0.4 * jaccard
+            if score < MIN_SCORE:
+                continue
+            for i in range(self._key_post_offsets[key], self._key_post_offsets[key + 1]):
+                position = self._key_post[i]
+                if score > best.get(position, 0.0):
+                    best[position] = score
+
+        top = heapq.nsmallest(offset + limit, best.items(), key=lambda item: (-item[1], item[0]))
+        page = [SearchResult(self._entry(position), round(score, 4)) for position, score in top[offset:]]
+        return len(best), page
+
+
+def _identity(stat: os.stat_result) -> Tuple[int, int, int]:
+    return stat.st_dev, stat.st_ino, stat.st_mtime_ns
+
+
+class SnapshotRegistry:
+    """Serves the current snapshot at `path`, switching when the file is replaced.
+
+    Each lookup stats the file at most every check_interval seconds; when a
+    new snapshot has been moved into place, the next lookup maps it and
+    notifies subscribers. Requests already holding the old snapshot finish
+    on it; its mapping is released once they drop it.
+    """
+
+    def __init__(self, path: str, entry_type: Callable[..., Any], check_interval: float = 1.0):
+        self.path = path
+        self.entry_type = entry_type
+        self.check_interval = check_interval
+        self._snapshot = PortSnapshot(path, entry_type)
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[], None]] = []
+
+    def subscribe(self, listener: Callable[[], None]) -> None:
+        """Call listener whenever a new snapshot is loaded."""
+        self._listeners.append(listener)
+
+    @property
+    def snapshot(self) -> PortSnapshot:
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            self.reload()
+        return self._snapshot
+
+    def reload(self) -> bool:
+        """Map the file again if it was replaced; returns whether it changed."""
+        with self._lock:
+            try:
+                identity = _identity(os.stat(self.path))
+            except FileNotFoundError:
+                return False
+            if identity == self._snapshot.identity:
+                return False
+            self._snapshot = PortSnapshot(self.path, self.entry_type)
+        for listener in self._listeners:
+            listener()
+        return True
+
+    def publish(self, entries: Iterable[Any]) -> int:
+        """Write a new snapshot over the current one and switch to it."""
+        count = write_snapshot(entries, self.path)
+        self.reload()
+        return count
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    def __contains__(self, entry_id: str) -> bool:
+        return entry_id in self.snapshot
+
+    def __iter__(self):
+        return iter(self.snapshot)
+
+    def entries(self) -> List[Any]:
+        return self.snapshot.entries()
+
+    def get(self, entry_id: str) -> Optional[Any]:
+        return self.snapshot.get(entry_id)
+
+    def by_country(self, country: str) -> List[Any]:
+        return self.snapshot.by_country(country)
+
+    def same_country(self, entry1_id: str, entry2_id: str) -> Optional[bool]:
+        return self.snapshot.same_country(entry1_id, entry2_id)
+
+    def search(self, query: str) -> List[Any]:
+        return self.snapshot.search(query)
+
+    def rank(self, query: str, limit: int, offset: int = 0) -> Tuple[int, List[SearchResult]]:
+        return self.snapshot.rank(query, limit, offset)
+
+
+def main(argv: Sequence[str]) -> int:
+    if len(argv) != 2:
+        print("usage: python -m langchain_react_agent.port_store PORTS_CSV SNAPSHOT", file=sys.stderr)
+        return 2
+    from langchain_react_agent.country_data import load_entries
+
+    count = write_snapshot(load_entries(argv[0]), argv[1])
+    print(f"Wrote {count} ports to {argv[1]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,127 @@
+"""Pre-fork process manager for running the server on several cores.
+
+uvicorn's own --workers mode spawns fresh interpreters, so every worker
+imports the agent and loads the port data again. PreforkServer imports the
+app once in the parent, binds the listening socket and then forks the
+workers, which share the loaded modules and data copy-on-write. Workers
+are restarted when they exit, which together with uvicorn's
+limit_max_requests recycles them after a number of requests. SIGTERM or
+SIGINT stops accepting new connections and lets in-flight requests finish
+for up to the graceful timeout before the workers are killed.
+
+Needs os.fork, so it is POSIX only.
+"""
+
+from typing import Dict, Optional
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+logger = logging.getLogger("uvicorn.error")
+
+# A worker exiting sooner than this after starting is treated as a crash
+# loop and restarted with a delay
+MIN_WORKER_LIFETIME = 1.0
+RESTART_DELAY = 1.0
+# Extra time given to workers after the graceful timeout before SIGKILL
+KILL_GRACE = 5.0
+
+
+class PreforkServer:
+    """Runs `workers` forked uvicorn servers on one shared socket."""
+
+    def __init__(self, config: uvicorn.Config, workers: int):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("PreforkServer needs os.fork; use uvicorn --workers on this platform")
+        self.config = config
+        self.workers = workers
+        self.children: Dict[int, float] = {}
+        self.stopping_since: Optional[float] = None
+
+    def run(self) -> None:
+        # Import the app, and with it the agent and port data, before forking
+        self.config.load()
+        sock = self.config.bind_socket()
+        # Keep the collector from touching (and so copying) the shared objects
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info("Starting %d workers (pid %d)", self.workers, os.getpid())
+        for _ in range(self.workers):
+            self.spawn(sock)
+
+        while self.children:
+            self.reap(sock)
+            if self.stopping_since is not None and self.deadline_passed():
+                for pid in list(self.children):
+                    logger.warning("Killing worker %d after the graceful timeout", pid)
+                    self.signal_child(pid, signal.SIGKILL)
+            time.sleep(0.1)
+        sock.close()
+        logger.info("All workers stopped")
+
+    def spawn(self, sock: socket.socket) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+        # Worker: uvicorn installs its own handlers for a graceful shutdown
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        status = 0
+        try:
+            uvicorn.Server(self.config).run(sockets=[sock])
+        except BaseException:
+            logger.exception("Worker %d failed", os.getpid())
+            status = 1
+        finally:
+            os._exit(status)
+
+    def reap(self, sock: socket.socket) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping_since is not None:
+                continue
+            lifetime = time.monotonic() - started
+            # waitpid's status word encodes the exit code or the signal
+            code = os.waitstatus_to_exitcode(status)
+            how = f"was killed by signal {-code}" if code < 0 else f"exited with code {code}"
+            logger.info("Worker %d %s after %.0fs, restarting", pid, how, lifetime)
+            if lifetime < MIN_WORKER_LIFETIME:
+                time.sleep(RESTART_DELAY)
+            self.spawn(sock)
+
+    def stop(self, signum, frame) -> None:
+        if self.stopping_since is not None:
+            # Second signal: don't wait for in-flight requests
+            for pid in list(self.children):
+                self.signal_child(pid, signal.SIGKILL)
+            return
+        logger.info("Shutting down, draining workers")
+        self.stopping_since = time.monotonic()
+        for pid in list(self.children):
+            self.signal_child(pid, signal.SIGTERM)
+
+    def deadline_passed(self) -> bool:
+        graceful = self.config.timeout_graceful_shutdown or 0
+        return time.monotonic() - self.stopping_since > graceful + KILL_GRACE
+
+    @staticmethod
+    def signal_child(pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
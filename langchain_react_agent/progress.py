@@ -0,0 +1,169 @@
+"""Agent progress as server-sent events.
+
+/agent/invoke answers once the whole ReAct loop has finished, which can
+take several LLM round trips. /agent/progress runs the same agent and
+sends what happens while it happens:
+
+    metadata    {"run_id"}                          as soon as the run starts
+    tool_start  {"tool", "input", "message"}        a tool call begins
+    tool_end    {"tool", "ok", "message", "output"} its result, summarized
+    token       {"text"}                            a token of the answer
+    end         {"output"}                          the final AI message
+    error       {"message"}                         the run failed
+
+Model steps that end in tool calls stream no text, so `token` events only
+carry answer text. A turn the fast path answers sends no tokens, only
+`end`. When the client disconnects, the stream is cancelled and with it
+the run and any LLM request still in flight, so an abandoned run stops
+taking up LLM capacity.
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+from pydantic_core import to_json
+from sse_starlette import EventSourceResponse, ServerSentEvent
+
+logger = logging.getLogger(__name__)
+
+# Seconds between keep-alive comments while a step is quiet
+PING_INTERVAL = 15
+
+
+def describe_tool_start(tool: str, args: Any) -> str:
+    """One line for the UI about the tool call that just started."""
+    args = args if isinstance(args, dict) else {}
+    if tool == "country_data":
+        operations = args.get("operations") or []
+        ports = [op.get("entry_id") for op in operations if op.get("operation") == "get_entry"]
+        searches = [op.get("search_query") for op in operations if op.get("operation") == "search"]
+        if ports:
+            return f"Validating port{'s' if len(ports) > 1 else ''} {', '.join(ports)}"
+        if searches:
+            return f"Searching ports for {', '.join(repr(query) for query in searches)}"
+        return "Checking port countries"
+    if tool == "container_check":
+        return "Checking containers"
+    return f"Running {tool}"
+
+
+def _describe_country_item(item: Dict[str, Any]) -> Tuple[bool, str]:
+    if "error" in item or item.get("status", 200) >= 400:
+        return False, str(item.get("error") or item.get("detail") or "lookup failed")
+    data = item.get("data")
+    if isinstance(data, list):
+        return True, f"Found {item.get('total', len(data))} matching ports"
+    if isinstance(data, dict) and "same_country" in data:
+        if data["same_country"]:
+            return True, f"Both ports are in {data['entry1_country']}"
+        return True, f"Ports are in different countries ({data['entry1_country']}, {data['entry2_country']})"
+    if isinstance(data, dict) and "id" in data:
+        return True, f"Port {data['id']} validated ({data.get('name')}, {data.get('country')})"
+    return True, "Ports checked"
+
+
+def describe_tool_end(tool: str, output: Any) -> Tuple[bool, str]:
+    """Whether the tool call succeeded, and one line for the UI about its result."""
+    if isinstance(output, BaseMessage):
+        output = output.content
+    if isinstance(output, str):
+        try:
+            output = json.loads(output)
+        except ValueError:
+            return True, output[:200]
+    if not isinstance(output, dict):
+        return True, f"{tool} finished"
+    if tool == "country_data":
+        items = output["data"] if isinstance(output.get("data"), list) and "total" not in output else [output]
+        described = [_describe_country_item(item) for item in items]
+        return all(ok for ok, _ in described), "; ".join(message for _, message in described)
+    if tool == "container_check":
+        if "error" in output:
+            return False, str(output["error"])
+        totals = (output.get("data") or {}).get("totals") or {}
+        counts = ", ".join(f"{count} x {kind}" for kind, count in totals.items() if count)
+        return True, f"Containers validated: {counts}" if counts else "Containers validated"
+    ok = "error" not in output
+    return ok, f"{tool} {'finished' if ok else 'failed'}"
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    # Content blocks, as some models stream them
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+def _final_message(output: Any) -> Optional[Dict[str, Any]]:
+    messages: List[Any] = output.get("messages", []) if isinstance(output, dict) else []
+    if not messages:
+        return None
+    message = messages[-1]
+    return message.model_dump() if isinstance(message, BaseMessage) else message
+
+
+async def progress_events(runnable: Runnable, graph_input: Any, config: RunnableConfig) -> AsyncIterator[Dict[str, Any]]:
+    """The progress of one run as {"event", "data"} dicts, ending with `end` or `error`."""
+    root: Optional[str] = None
+    # Final state of the graph, a direct child of the root run. The root's
+    # own output is only the last streamed chunk when the graph is wrapped in a sequence
+    state: Any = None
+    try:
+        async for event in runnable.astream_events(graph_input, config, version="v2"):
+            kind = event["event"]
+            if root is None:
+                root = event["run_id"]
+                yield {"event": "metadata", "data": {"run_id": root}}
+            if kind == "on_chat_model_stream":
+                text = _text(event["data"]["chunk"].content)
+                if text:
+                    yield {"event": "token", "data": {"text": text}}
+            elif kind == "on_tool_start":
+                args = event["data"].get("input")
+                yield {"event": "tool_start", "data": {
+                    "tool": event["name"],
+                    "run_id": event["run_id"],
+                    "input": args,
+                    "message": describe_tool_start(event["name"], args),
+                }}
+            elif kind == "on_tool_end":
+                output = event["data"].get("output")
+                ok, message = describe_tool_end(event["name"], output)
+                yield {"event": "tool_end", "data": {
+                    "tool": event["name"],
+                    "run_id": event["run_id"],
+                    "ok": ok,
+                    "message": message,
+                    "output": output.content if isinstance(output, BaseMessage) else output,
+                }}
+            elif kind == "on_chain_end" and event["run_id"] == root:
+                yield {"event": "end", "data": {"output": _final_message(state or event["data"].get("output"))}}
+            elif kind == "on_chain_end" and event["parent_ids"] == [root]:
+                output = event["data"].get("output")
+                if isinstance(output, dict) and "messages" in output:
+                    state = output
+    except asyncio.CancelledError:
+        logger.info("Progress stream of run %s cancelled by the client", root)
+        raise
+    except Exception as e:
+        logger.exception("Agent run %s failed while streaming progress", root)
+        yield {"event": "error", "data": {"message": f"{type(e).__name__}: {e}"}}
+
+
+async def _server_sent(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[ServerSentEvent]:
+    async for event in events:
+        yield ServerSentEvent(data=to_json(event["data"]).decode(), event=event["event"])
+
+
+def progress_response(runnable: Runnable, graph_input: Any, config: RunnableConfig) -> EventSourceResponse:
+    """Stream the run as SSE; the run is cancelled when the client goes away."""
+    return EventSourceResponse(
+        _server_sent(progress_events(runnable, graph_input, config)),
+        ping=PING_INTERVAL,
+        # Proxies such as nginx would otherwise hold the events back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
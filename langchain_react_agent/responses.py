@@ -0,0 +1,20 @@
+"""JSON responses encoded by pydantic-core.
+
+FastAPI runs whatever an endpoint returns through jsonable_encoder, which
+walks the result in Python, before json.dumps encodes it. The sub-app
+endpoints return FastJSONResponse instead: to_json serializes dicts,
+models and enums in one native pass, and the response skips FastAPI's
+encoding step because it already is a Response.
+"""
+
+from typing import Any
+
+from pydantic_core import to_json
+from starlette.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with pydantic_core.to_json."""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
@@ -1,12 +1,15 @@
-from fastapi import FastAPI, Body, HTTPException
-from langserve import add_routes
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.runnables import RunnableConfig
-from typing import List, Union, Dict, Any
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from langchain_core.runnables import ConfigurableField, RunnableBinding, RunnableConfig, RunnableGenerator, RunnableLambda
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 from pydantic import BaseModel, Field
+import logging
+import functools
 import os
 import sys
+import uuid
 from pathlib import Path
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 # Add the parent directory to the Python path
@@ -18,15 +21,26 @@ if str(parent_dir) not in sys.path:
 # Load environment variables
 load_dotenv(override=True)
 
+from langchain_react_agent.instrumentation import (
+    Metrics, MetricsCallbackHandler, MetricsMiddleware, configure_logging, hit_ratio
+)
+from langchain_react_agent.tracing import TraceStore, TracingCallbackHandler
+
+logger = logging.getLogger(__name__)
+
 try:
-    from langchain_react_agent.agent import byo_chatgpt
+    from langchain_react_agent.agent import dispatcher, get_agent, llm_retry, tool_cache
+    from langchain_react_agent.admission import AdmissionController, AdmissionMiddleware
     from langchain_react_agent.country_data import app as country_data_app
     from langchain_react_agent.container_data import app as container_data_app
+    from langchain_react_agent.dispatch import register_local_apps
+    from langchain_react_agent.progress import progress_response
+    from langchain_react_agent import fast_path
 except ImportError as e:
-    print(f"Error importing modules: {e}")
-    print(f"Current sys.path: {sys.path}")
-    print(f"Current directory: {os.getcwd()}")
-    print(f"Looking for modules in: {current_dir}")
+    logger.error(
+        "Error importing modules: %s", e,
+        extra={"sys_path": sys.path, "cwd": os.getcwd(), "module_dir": str(current_dir)},
+    )
     raise
 
 # Define input/output models
@@ -37,7 +51,14 @@ class AgentMessage(BaseModel):
     additional_kwargs: Dict[str, Any] = Field(default_factory=dict)
 
 class AgentInput(BaseModel):
-    """Input model for the agent."""
+    """Input model for the agent.
+
+    Send an X-Thread-Id header (any client-chosen unique string) to continue
+    a conversation; the server keeps the history, so each request only
+    carries the new message and the response only this turn's messages.
+    Without the header nothing is stored and the request carries the full
+    history.
+    """
     messages: List[AgentMessage]
 
     class Config:
@@ -53,79 +74,300 @@ class AgentInput(BaseModel):
             }
         }
 
-# Create FastAPI app
-app = FastAPI(
-    title="LangChain React Agent",
-    version="1.0",
-    description="A LangChain agent with React and Hono API integration",
-    docs_url="/docs",
-    redoc_url="/redoc",
-    openapi_url="/openapi.json"
-)
+class ProgressRequest(BaseModel):
+    """Body of /agent/progress: the same input as /agent/invoke, and optionally a thread id."""
+    input: AgentInput
+    config: Dict[str, Any] = Field(default_factory=dict)
 
-# Add health check endpoint with more detailed information
-@app.get("/health")
-async def health_check():
-    """Health check endpoint for cloud deployment."""
-    return {
-        "status": "ok",
-        "environment": os.getenv("ENVIRONMENT", "development"),
-        "openai_api_key": "configured" if os.getenv("OPENAI_API_KEY") else "missing",
-        "python_path": sys.path,
-        "current_directory": os.getcwd(),
-        "module_location": str(current_dir)
-    }
-
-# Mount the apps at different paths
-try:
-    app.mount("/api/country", country_data_app)
-    app.mount("/api/container", container_data_app)
-except Exception as e:
-    print(f"Error mounting apps: {e}")
-    raise
+def to_graph_input(payload: Any, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+    """Turn the validated AgentInput into plain message dicts the graph can coerce.
 
-# Add routes for the agent with proper type definitions
-try:
-    add_routes(
-        app,
-        byo_chatgpt,
-        path="/agent",
-        enable_feedback_endpoint=True,
-        enable_public_trace_link_endpoint=True,
-        input_type=AgentInput,
-        per_req_config_modifier=lambda config: {
-            **config,
-            "configurable": {
-                **config.get("configurable", {}),
-                "openai_api_key": os.getenv("OPENAI_API_KEY")
-            }
+    With a turn_id in the config, the new messages get ids starting with it,
+    which marks where this turn starts in the thread history.
+    """
+    turn_id = (config or {}).get("configurable", {}).get("turn_id")
+    messages = []
+    for i, message in enumerate(payload["messages"] if isinstance(payload, dict) else payload.messages):
+        message = message.model_dump() if isinstance(message, BaseModel) else message
+        if turn_id and isinstance(message, dict) and not message.get("id"):
+            message = {**message, "id": f"{turn_id}-{i}"}
+        messages.append(message)
+    return {"messages": messages}
+
+def this_turn(output: Any, config: RunnableConfig) -> Any:
+    """Graph state cut down to the messages of this turn, when the run is on a thread."""
+    configurable = config.get("configurable", {})
+    turn_id = configurable.get("turn_id")
+    messages = output.get("messages") if isinstance(output, dict) else None
+    if not turn_id or not configurable.get("thread_id") or not messages:
+        return output
+    for i, message in enumerate(messages):
+        if (getattr(message, "id", None) or "").startswith(turn_id):
+            return {**output, "messages": messages[i:]}
+    return output
+
+def new_messages(chunks: Iterator[Any], config: RunnableConfig) -> Iterator[Any]:
+    for chunk in chunks:
+        yield this_turn(chunk, config)
+
+async def anew_messages(chunks: AsyncIterator[Any], config: RunnableConfig) -> AsyncIterator[Any]:
+    async for chunk in chunks:
+        yield this_turn(chunk, config)
+
+def create_app() -> FastAPI:
+    """Build the server app: the agent routes, the mounted sub-apps and the stats endpoints.
+
+    The agent is built on the first call (see agent.get_agent()) and shared by later ones.
+    """
+    # LOG_LEVEL=DEBUG also logs request bodies; LOG_FORMAT=json for log shippers
+    configure_logging(os.getenv("LOG_LEVEL", "INFO"), os.getenv("LOG_FORMAT", "text"))
+    agent = get_agent()
+    checkpointer = agent.checkpointer
+    token_budget = agent.token_budget
+    llm_cassette = agent.llm_cassette
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """Release the pooled tool connections and the thread store on shutdown."""
+        yield
+        await dispatcher.aclose()
+        if checkpointer is not None:
+            checkpointer.close()
+
+    # Create FastAPI app
+    app = FastAPI(
+        lifespan=lifespan,
+        title="LangChain React Agent",
+        version="1.0",
+        description="A LangChain agent with React and Hono API integration",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        openapi_url="/openapi.json"
+    )
+
+    # Agent runs are LLM-bound: cap how many run at once and queue the rest fairly
+    # per client; requests that can't be queued get 429/503 with Retry-After
+    AGENT_MAX_QUEUE = int(os.getenv("AGENT_MAX_QUEUE", "32"))
+    admission = AdmissionController(
+        max_in_flight=int(os.getenv("AGENT_MAX_IN_FLIGHT", "8")),
+        max_queue=AGENT_MAX_QUEUE,
+        queue_timeout=float(os.getenv("AGENT_QUEUE_TIMEOUT", "30")),
+        max_queue_per_client=int(os.getenv("AGENT_QUEUE_PER_CLIENT", str(max(AGENT_MAX_QUEUE // 4, 1)))),
+    )
+    app.add_middleware(AdmissionMiddleware, controller=admission, prefix="/agent")
+
+    # Latency and outcome per route, tool and LLM call; added last so it is the
+    # outermost middleware and also sees admission rejections
+    metrics = Metrics()
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+    metrics.add_collector("tool_cache", tool_cache.stats)
+    metrics.add_collector("fast_path", fast_path.stats.snapshot)
+    metrics.add_collector("token_budget", token_budget.stats)
+    metrics.add_collector("admission", lambda: {**admission.stats(), "llm_retries": llm_retry.stats()})
+    if llm_cassette is not None:
+        metrics.add_collector("llm_cassette", llm_cassette.stats)
+    if checkpointer is not None:
+        def thread_metrics() -> Dict[str, Any]:
+            stats = checkpointer.stats()
+            return {**stats, "hit_ratio": hit_ratio(stats["cache_hits"], stats["cache_misses"])}
+        metrics.add_collector("threads", thread_metrics)
+
+    # Add health check endpoint with more detailed information
+    @app.get("/health")
+    async def health_check():
+        """Health check endpoint for cloud deployment."""
+        return {
+            "status": "ok",
+            "environment": os.getenv("ENVIRONMENT", "development"),
+            "openai_api_key": "configured" if os.getenv("OPENAI_API_KEY") else "missing",
+            "python_path": sys.path,
+            "current_directory": os.getcwd(),
+            "module_location": str(current_dir)
         }
+
+    @app.get("/metrics")
+    async def metrics_endpoint(format: str = "prometheus"):
+        """Request rates, errors and latency per route, tool and LLM call, with token and cache counters.
+
+        Prometheus text format by default; ?format=json gives percentiles instead of buckets.
+        """
+        if format == "json":
+            return metrics.snapshot()
+        return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/tool-cache/stats")
+    async def tool_cache_stats():
+        """Hit/miss counters and size of the agent tool-result cache."""
+        return tool_cache.stats()
+
+    @app.post("/tool-cache/invalidate")
+    async def tool_cache_invalidate(tool: Optional[str] = None):
+        """Drop cached tool results, e.g. after the port dataset was reloaded elsewhere."""
+        return {"invalidated": tool_cache.invalidate(tool)}
+
+    @app.get("/fast-path/stats")
+    async def fast_path_stats():
+        """How many agent turns were answered without the LLM, and why the rest fell back."""
+        return fast_path.stats.snapshot()
+
+    @app.get("/admission/stats")
+    async def admission_stats():
+        """Agent runs in flight, queue depth, wait times and rejections, plus LLM API retries."""
+        return {**admission.stats(), "llm_retries": llm_retry.stats()}
+
+    @app.get("/token-budget/stats")
+    async def token_budget_stats():
+        """Prompt tokens per model call against the budget, plus the usage the API reported."""
+        return token_budget.stats()
+
+    # Mount the apps at different paths
+    try:
+        app.mount("/api/country", country_data_app)
+        app.mount("/api/container", container_data_app)
+        # The tools can now call the sub-apps without the HTTP loopback
+        register_local_apps()
+    except Exception:
+        logger.exception("Error mounting apps")
+        raise
+
+    # Span timelines of recent agent runs, keyed by the run id langserve returns
+    # in the response metadata. With AGENT_PROFILING=1, requests sent with an
+    # X-Profile: 1 header are also profiled.
+    AGENT_PROFILING = os.getenv("AGENT_PROFILING", "0") == "1"
+    traces = TraceStore(maxsize=int(os.getenv("AGENT_TRACE_HISTORY", "200")))
+    tracing_handler = TracingCallbackHandler(
+        traces,
+        sample_rate=float(os.getenv("AGENT_TRACE_SAMPLE_RATE", "1")),
+        profiling=AGENT_PROFILING,
+        max_run_seconds=float(os.getenv("AGENT_TRACE_TIMEOUT", "600")),
     )
-except Exception as e:
-    print(f"Error adding routes: {e}")
-    print(f"Error type: {type(e)}")
-    print(f"Error details: {str(e)}")
-    raise
 
-# Add error handlers
-@app.exception_handler(Exception)
-async def generic_exception_handler(request, exc):
-    """Handle all unhandled exceptions."""
-    error_details = {
-        "error": str(exc),
-        "detail": "An unexpected error occurred",
-        "type": type(exc).__name__,
-        "python_path": sys.path,
-        "current_directory": os.getcwd()
-    }
+    graph = agent.graph
+    if checkpointer is not None:
+        # Requests without a thread run the graph without the thread store. The
+        # compiled graph has no configurable_alternatives, a binding around it does
+        graph = RunnableBinding(bound=graph).configurable_alternatives(
+            ConfigurableField(id="agent_graph"), default_key="threaded", stateless=agent.stateless_graph
+        )
+    agent_runnable = (
+        RunnableLambda(to_graph_input) | graph | RunnableGenerator(new_messages, anew_messages)
+    ).with_config(callbacks=[
+        MetricsCallbackHandler(metrics, max_run_seconds=tracing_handler.max_run_seconds), tracing_handler
+    ])
+
+    def per_request_config(config: Dict[str, Any], request: Request) -> Dict[str, Any]:
+        """Inject the API key and pick the thread, if the request continues one."""
+        configurable = {
+            **config.get("configurable", {}),
+            "openai_api_key": os.getenv("OPENAI_API_KEY")
+        }
+        if checkpointer is not None:
+            thread_id = configurable.get("thread_id") or request.headers.get("x-thread-id")
+            if thread_id:
+                configurable.update(thread_id=thread_id, agent_graph="threaded", turn_id=uuid.uuid4().hex)
+            else:
+                # The request carries the full history; storing it would only
+                # leave a thread behind that nobody can continue
+                configurable.pop("thread_id", None)
+                configurable["agent_graph"] = "stateless"
+        if AGENT_PROFILING and request.headers.get("x-profile") == "1":
+            config = {**config, "metadata": {**config.get("metadata", {}), "profile": True}}
+        return {**config, "configurable": configurable}
+
+    @app.get("/debug/traces")
+    async def recent_traces(limit: int = 50):
+        """The most recent traced agent runs, newest first."""
+        return traces.recent(limit)
+
+    @app.get("/debug/traces/{run_id}")
+    async def get_trace(run_id: str):
+        """Span timeline of one agent run: graph nodes, LLM and tool calls, sub-app requests."""
+        trace = traces.get(run_id)
+        if trace is None:
+            raise HTTPException(status_code=404, detail=f"No trace for run {run_id}")
+        return trace.to_dict()
+
+    @app.get("/debug/traces/{run_id}/profile")
+    async def get_profile(run_id: str):
+        """Sampled stacks of a profiled run, in collapsed format for flamegraph.pl or speedscope."""
+        trace = traces.get(run_id)
+        if trace is None or trace.profile is None:
+            raise HTTPException(status_code=404, detail=f"No profile for run {run_id}")
+        return PlainTextResponse(trace.profile)
+
+    @app.get("/threads/stats")
+    async def thread_stats():
+        """Stored conversation threads and the hit rate of the in-memory front."""
+        if checkpointer is None:
+            return {"enabled": False}
+        return {"enabled": True, **checkpointer.stats()}
+
+    @app.delete("/threads/{thread_id}")
+    async def delete_thread(thread_id: str):
+        """Forget a conversation before its TTL runs out."""
+        if checkpointer is None:
+            raise HTTPException(status_code=404, detail="Thread checkpointing is disabled")
+        await checkpointer.adelete_thread(thread_id)
+        return {"deleted": thread_id}
+
+    # Add routes for the agent with proper type definitions
+    try:
+        from langserve import add_routes
+
+        add_routes(
+            app,
+            agent_runnable,
+            path="/agent",
+            enable_feedback_endpoint=True,
+            enable_public_trace_link_endpoint=True,
+            input_type=AgentInput,
+            per_req_config_modifier=per_request_config
+        )
+    except Exception:
+        logger.exception("Error adding routes")
+        raise
+
+    @app.post("/agent/progress")
+    async def agent_progress(body: ProgressRequest, request: Request):
+        """Run the agent and stream tool calls, answer tokens and the final message as server-sent events.
+
+        The run is cancelled when the client disconnects.
+        """
+        thread_id = body.config.get("configurable", {}).get("thread_id")
+        config = per_request_config({"configurable": {"thread_id": thread_id}} if thread_id else {}, request)
+        return progress_response(agent_runnable, to_graph_input(body.input), config)
+
+    # Add error handlers
+    @app.exception_handler(Exception)
+    async def generic_exception_handler(request, exc):
+        """Handle all unhandled exceptions."""
+        error_details = {
+            "error": str(exc),
+            "detail": "An unexpected error occurred",
+            "type": type(exc).__name__,
+            "python_path": sys.path,
+            "current_directory": os.getcwd()
+        }
     
-    # Add more details for Pydantic errors
-    if "pydantic" in str(type(exc).__module__):
-        error_details.update({
-            "pydantic_error": True,
-            "error_code": getattr(exc, "code", None),
-            "error_type": getattr(exc, "type", None),
-            "error_location": getattr(exc, "loc", None)
-        })
+        # Add more details for Pydantic errors
+        if "pydantic" in str(type(exc).__module__):
+            error_details.update({
+                "pydantic_error": True,
+                "error_code": getattr(exc, "code", None),
+                "error_type": getattr(exc, "type", None),
+                "error_location": getattr(exc, "loc", None)
+            })
     
-    return error_details 
\ No newline at end of file
+        return JSONResponse(status_code=500, content=error_details)
+
+    return app
+
+@functools.lru_cache(maxsize=None)
+def _default_app() -> FastAPI:
+    return create_app()
+
+def __getattr__(name):
+    # `server:app` for uvicorn and langserve; built on first access, not at import
+    if name != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return _default_app()
@@ -0,0 +1,79 @@
+"""Request coalescing for identical concurrent calls.
+
+While a call for a key is in flight, further callers with the same key wait
+for it and receive its result (or its exception) instead of starting their
+own execution. Once the call finishes the key is released, so later callers
+run again; caching results is left to the caller.
+"""
+
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+import threading
+
+
+class SingleFlight:
+    """Coalesces identical calls made concurrently from different threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.executed += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """Coalesces identical coroutine calls made concurrently on an event loop.
+
+    The shared call runs as its own task, so a waiter being cancelled (e.g.
+    its client disconnected) does not cancel the call for everyone else.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def _release(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away
+            task.exception()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+            self.executed += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
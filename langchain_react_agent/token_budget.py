@@ -0,0 +1,212 @@
+"""Prompt token budget for the ReAct agent.
+
+Runs as the agent's pre-model hook: tool results from earlier turns are
+compacted to one-line digests (old search result lists are the main cost),
+and if the history still exceeds the budget the oldest turns are dropped.
+A current turn that is over budget on its own is sent whole with its tool
+results cut short, and counted as over budget. The checkpointed history
+itself is left untouched; only what is sent to the model shrinks. Every
+model call records its prompt size and, after the call, the usage the API
+reported, so cost can be tracked against the budget.
+"""
+
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+import json
+import threading
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+from langchain_core.runnables import RunnableConfig
+
+# Characters a compacted tool result may keep
+DIGEST_CHARS = 160
+# Appended to a tool result cut to fit the budget
+TRUNCATED = " ... [truncated to fit the prompt budget]"
+
+
+def make_token_counter(model: str) -> Callable[[Sequence[BaseMessage]], int]:
+    """Exact counts with tiktoken when its encoding is available, else an estimate."""
+    try:
+        import tiktoken
+
+        encoding = tiktoken.encoding_for_model(model)
+    except Exception:
+        return count_tokens_approximately
+
+    def count(messages: Sequence[BaseMessage]) -> int:
+        # ~4 tokens of framing per message, as in OpenAI's cookbook
+        total = 3
+        for message in messages:
+            content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+            total += 4 + len(encoding.encode(content))
+            for tool_call in getattr(message, "tool_calls", None) or []:
+                total += len(encoding.encode(tool_call["name"] + json.dumps(tool_call["args"])))
+        return total
+
+    return count
+
+
+def digest(message: ToolMessage) -> str:
+    """One-line summary of a tool result that is no longer needed verbatim."""
+    try:
+        payload = json.loads(message.content) if isinstance(message.content, str) else message.content
+    except ValueError:
+        payload = message.content
+    data = payload.get("data") if isinstance(payload, dict) else None
+    if isinstance(data, list):
+        ids = [str(item.get("id", item.get("status", "?"))) for item in data if isinstance(item, dict)]
+        text = f"{len(data)} results: {', '.join(ids[:5])}{', ...' if len(ids) > 5 else ''}"
+    elif isinstance(payload, dict) and "error" in payload:
+        text = f"error: {payload['error']}"
+    else:
+        text = payload if isinstance(payload, str) else json.dumps(payload)
+    return f"[{message.name or 'tool'} result, compacted] {text}"[:DIGEST_CHARS]
+
+
+class TokenBudget:
+    """Trims the model input to a token budget and keeps per-call token counts."""
+
+    def __init__(
+        self,
+        max_tokens: int,
+        fixed_tokens: int = 0,
+        token_counter: Callable[[Sequence[BaseMessage]], int] = count_tokens_approximately,
+        history_size: int = 100,
+    ):
+        self.max_tokens = max_tokens
+        # System prompt and tool schemas go out with every call
+        self.fixed_tokens = fixed_tokens
+        self.token_counter = token_counter
+        self._lock = threading.Lock()
+        self.turns: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self.calls = 0
+        self.over_budget = 0
+        self.prompt_tokens = 0
+        self.trimmed_tokens = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    @property
+    def message_budget(self) -> int:
+        return max(self.max_tokens - self.fixed_tokens, 0)
+
+    @staticmethod
+    def compact(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        """Replace tool results from before the latest human message with digests."""
+        last_human = max(
+            (i for i, message in enumerate(messages) if isinstance(message, HumanMessage)),
+            default=-1,
+        )
+        return [
+            message.model_copy(update={"content": digest(message)})
+            if isinstance(message, ToolMessage) and i < last_human
+            else message
+            for i, message in enumerate(messages)
+        ]
+
+    @staticmethod
+    def current_turn(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        """The latest human message and everything after it, with a leading system message."""
+        last_human = max(
+            (i for i, message in enumerate(messages) if isinstance(message, HumanMessage)),
+            default=0,
+        )
+        head = list(messages[:1]) if messages and isinstance(messages[0], SystemMessage) and last_human > 0 else []
+        return head + list(messages[last_human:])
+
+    def shorten(self, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        """Cut the longest tool results, down to DIGEST_CHARS each, until the messages fit."""
+        messages = list(messages)
+        tools = sorted(
+            (i for i, message in enumerate(messages) if isinstance(message, ToolMessage)),
+            key=lambda i: len(str(messages[i].content)),
+            reverse=True,
+        )
+        for i in tools:
+            content = messages[i].content if isinstance(messages[i].content, str) else json.dumps(messages[i].content)
+            excess = self.token_counter(messages) - self.message_budget
+            while excess > 0 and len(content) > DIGEST_CHARS:
+                # ~4 characters per token; repeat when the estimate falls short
+                content = content[:max(len(content) - excess * 4, DIGEST_CHARS)]
+                messages[i] = messages[i].model_copy(update={"content": content + TRUNCATED})
+                excess = self.token_counter(messages) - self.message_budget
+            if excess <= 0:
+                break
+        return messages
+
+    def fit(self, messages: Sequence[BaseMessage], thread_id: Optional[str] = None) -> List[BaseMessage]:
+        before = self.token_counter(messages)
+        fitted = self.compact(messages)
+        over_budget = False
+        if self.token_counter(fitted) > self.message_budget:
+            trimmed = trim_messages(
+                fitted,
+                max_tokens=self.message_budget,
+                token_counter=self.token_counter,
+                strategy="last",
+                start_on="human",
+                allow_partial=False,
+            )
+            if not trimmed:
+                # The current turn alone is over budget. It goes out whole, so
+                # every tool call keeps its result, with the results cut short
+                over_budget = True
+                fitted = self.shorten(self.current_turn(fitted))
+            else:
+                fitted = trimmed
+        after = self.token_counter(fitted)
+        over_budget = over_budget or after + self.fixed_tokens > self.max_tokens
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += after + self.fixed_tokens
+            self.trimmed_tokens += before - after
+            if over_budget:
+                self.over_budget += 1
+            self.turns.append({
+                "thread_id": thread_id,
+                "messages": len(messages),
+                "sent_messages": len(fitted),
+                "history_tokens": before,
+                "prompt_tokens": after + self.fixed_tokens,
+                "over_budget": over_budget,
+            })
+        return fitted
+
+    def record_usage(self, message: BaseMessage, thread_id: Optional[str] = None) -> None:
+        usage = getattr(message, "usage_metadata", None)
+        if not usage:
+            return
+        with self._lock:
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+            # Attach the reported usage to this thread's latest estimate
+            for turn in reversed(self.turns):
+                if turn["thread_id"] == thread_id and "input_tokens" not in turn:
+                    turn["input_tokens"] = usage.get("input_tokens", 0)
+                    turn["output_tokens"] = usage.get("output_tokens", 0)
+                    break
+
+    def pre_model_hook(self, state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        thread_id = config.get("configurable", {}).get("thread_id")
+        return {"llm_input_messages": self.fit(state["messages"], thread_id)}
+
+    def post_model_hook(self, state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        message = state["messages"][-1]
+        if isinstance(message, AIMessage):
+            self.record_usage(message, config.get("configurable", {}).get("thread_id"))
+        return {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_tokens": self.max_tokens,
+                "fixed_tokens": self.fixed_tokens,
+                "calls": self.calls,
+                "over_budget": self.over_budget,
+                "prompt_tokens": self.prompt_tokens,
+                "trimmed_tokens": self.trimmed_tokens,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "recent_turns": list(self.turns),
+            }
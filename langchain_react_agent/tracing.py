@@ -0,0 +1,323 @@
+"""Per-run span timelines and an opt-in sampling profiler.
+
+TracingCallbackHandler turns the callbacks of an agent run into a trace:
+one span per graph node, LLM call and tool call, nested by parent run.
+Code outside LangChain adds its own spans with `span()`, e.g. the
+dispatcher around sub-app requests; it looks up the open trace through a
+context variable and costs next to nothing when the run is not traced.
+Finished traces are kept in a bounded TraceStore under the root run id,
+which langserve returns as `metadata.run_id`.
+
+SamplingProfiler samples the stacks of all threads at a fixed interval
+and renders them in the collapsed format read by flamegraph.pl and
+speedscope. It sees the whole process, so requests running at the same
+time show up in the same profile.
+"""
+
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID, uuid4
+import os
+import random
+import sys
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# The trace of the run executing in this context and the id of the innermost open span
+_current: ContextVar[Optional[Tuple["Trace", str]]] = ContextVar("agent_trace", default=None)
+
+
+class Trace:
+    """The spans of one agent run, with start offsets relative to the run start."""
+
+    def __init__(self, run_id: str, name: str):
+        self.run_id = run_id
+        self.name = name
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: Dict[str, Dict[str, Any]] = {}
+        self.duration_ms: Optional[float] = None
+        self.profile: Optional[str] = None
+
+    def open(self, span_id: str, name: str, kind: str, parent: Optional[str], **attrs: Any) -> None:
+        span = {
+            "id": span_id,
+            "parent": parent,
+            "name": name,
+            "kind": kind,
+            "start_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "duration_ms": None,
+        }
+        if attrs:
+            span["attrs"] = attrs
+        with self._lock:
+            self.spans[span_id] = span
+
+    def close(self, span_id: str, error: Optional[BaseException] = None) -> None:
+        end_ms = (time.perf_counter() - self._start) * 1000
+        with self._lock:
+            span = self.spans.get(span_id)
+            if span is None:
+                return
+            span["duration_ms"] = round(end_ms - span["start_ms"], 3)
+            if error is not None:
+                span["error"] = f"{type(error).__name__}: {error}"
+
+    def finish(self) -> None:
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 3)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": len(self.spans),
+            "profiled": self.profile is not None,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans.values(), key=lambda span: span["start_ms"])
+        # Time per kind of span, counting only the outermost span of each kind
+        # so nested spans of the same kind are not added twice
+        by_kind: Dict[str, float] = {}
+        kinds = {span["id"]: span["kind"] for span in spans}
+        parents = {span["id"]: span["parent"] for span in spans}
+        for span in spans:
+            ancestor = span["parent"]
+            while ancestor is not None and kinds.get(ancestor) != span["kind"]:
+                ancestor = parents.get(ancestor)
+            if ancestor is None and span["duration_ms"] is not None:
+                by_kind[span["kind"]] = round(by_kind.get(span["kind"], 0) + span["duration_ms"], 3)
+        return {**self.summary(), "time_by_kind_ms": by_kind, "spans": spans}
+
+
+class TraceStore:
+    """The most recent `maxsize` traces, by run id."""
+
+    def __init__(self, maxsize: int = 200):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+
+    def add(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces[trace.run_id] = trace
+            while len(self._traces) > self.maxsize:
+                self._traces.popitem(last=False)
+
+    def get(self, run_id: str) -> Optional[Trace]:
+        with self._lock:
+            return self._traces.get(run_id)
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces.values())[-limit:]
+        return [trace.summary() for trace in reversed(traces)]
+
+
+@contextmanager
+def span(name: str, kind: str, **attrs: Any) -> Iterator[None]:
+    """Record the enclosed block as a span of the current run, if it is traced."""
+    current = _current.get()
+    if current is None:
+        yield
+        return
+    trace, parent = current
+    span_id = uuid4().hex
+    trace.open(span_id, name, kind, parent, **attrs)
+    token = _current.set((trace, span_id))
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current.reset(token)
+        trace.close(span_id, error)
+
+
+class SamplingProfiler:
+    """Samples every thread's stack from a background thread."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.collapsed()
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """`frame;frame;frame count` lines, outermost frame first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Builds a Trace for each sampled agent run from its callbacks.
+
+    Runs whose config metadata has `profile` set are also profiled, when
+    profiling is enabled; only one profile is taken at a time. A run that
+    never gets its end callback, e.g. one cancelled when a progress stream
+    is closed, is dropped with its profiler once it is `max_run_seconds` old.
+    """
+
+    # Must run in the caller's context so span() sees the open trace
+    run_inline = True
+
+    def __init__(self, store: TraceStore, sample_rate: float = 1.0, profiling: bool = False,
+                 profile_interval: float = 0.005, max_run_seconds: float = 600.0):
+        self.store = store
+        self.sample_rate = sample_rate
+        self.profiling = profiling
+        self.profile_interval = profile_interval
+        self.max_run_seconds = max_run_seconds
+        self._lock = threading.Lock()
+        # Every run of a traced tree, mapped to its trace and to the nearest
+        # recorded ancestor span (runs that aren't recorded map to their parent's)
+        self._runs: Dict[UUID, Tuple[Trace, Optional[str], bool]] = {}
+        self._profilers: Dict[UUID, SamplingProfiler] = {}
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, kind: Optional[str],
+               metadata: Optional[Dict[str, Any]] = None, **attrs: Any) -> None:
+        if parent_run_id is None:
+            self._drop_stale()
+            metadata = metadata or {}
+            profile = self.profiling and bool(metadata.get("profile"))
+            if not profile and random.random() >= self.sample_rate:
+                return
+            trace = Trace(str(run_id), name)
+            if profile:
+                self._start_profiler(run_id)
+            parent = None
+            kind = "run"
+        else:
+            with self._lock:
+                entry = self._runs.get(parent_run_id)
+            if entry is None:
+                return
+            trace, parent_span, recorded = entry
+            parent = str(parent_run_id) if recorded else parent_span
+        if kind is None:
+            with self._lock:
+                self._runs[run_id] = (trace, parent, False)
+            return
+        trace.open(str(run_id), name, kind, parent, **attrs)
+        with self._lock:
+            self._runs[run_id] = (trace, parent, True)
+        _current.set((trace, str(run_id)))
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            entry = self._runs.pop(run_id, None)
+        if entry is None:
+            return
+        trace, parent, recorded = entry
+        if recorded:
+            trace.close(str(run_id), error)
+            current = _current.get()
+            if current is not None and current[1] == str(run_id):
+                _current.set((trace, parent) if parent is not None else None)
+        if parent is None and recorded:
+            trace.finish()
+            # Runs inside it that were cancelled without an end callback
+            self._drop(trace)
+            profiler = self._profilers.pop(run_id, None)
+            if profiler is not None:
+                trace.profile = profiler.stop()
+            self.store.add(trace)
+
+    def _drop(self, trace: Trace) -> List[UUID]:
+        """Forget every open run of `trace`; returns their ids."""
+        with self._lock:
+            run_ids = [run_id for run_id, entry in self._runs.items() if entry[0] is trace]
+            for run_id in run_ids:
+                del self._runs[run_id]
+        return run_ids
+
+    def _drop_stale(self) -> None:
+        """Forget runs whose root started more than max_run_seconds ago, and stop their profilers."""
+        cutoff = time.time() - self.max_run_seconds
+        with self._lock:
+            stale = [trace for trace, parent, _ in self._runs.values() if parent is None and trace.started_at < cutoff]
+        for trace in stale:
+            for run_id in self._drop(trace):
+                with self._lock:
+                    profiler = self._profilers.pop(run_id, None)
+                if profiler is not None:
+                    profiler.stop()
+
+    def _start_profiler(self, run_id: UUID) -> None:
+        with self._lock:
+            if self._profilers:
+                return
+            profiler = self._profilers[run_id] = SamplingProfiler(self.profile_interval)
+        profiler.start()
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                       metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "chain"
+        node = (metadata or {}).get("langgraph_node")
+        # Graph nodes are chains named after the node; the runnables inside them aren't recorded
+        kind = "node" if node is not None and name == node else None
+        self._start(run_id, parent_run_id, name, kind, metadata)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        model = (metadata or {}).get("ls_model_name") or "llm"
+        self._start(run_id, parent_run_id, model, "llm", metadata, messages=sum(len(batch) for batch in messages))
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                      metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._start(run_id, parent_run_id, name, "tool", metadata)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
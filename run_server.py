@@ -1,5 +1,11 @@
-"""Entry point script for running the LangChain React Agent server."""
+"""Entry point script for running the LangChain React Agent server.
 
+ENVIRONMENT=development (the default) runs a single process with auto-reload.
+ENVIRONMENT=production preloads the app and forks WEB_CONCURRENCY workers,
+see langchain_react_agent/prefork.py.
+"""
+
+import inspect
 import uvicorn
 import os
 from dotenv import load_dotenv
@@ -7,21 +13,61 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv(override=True)
 
+# uvicorn calls the factory, so the agent is built when the server starts
+APP = "langchain_react_agent.server:create_app"
+
+
+def run_production(host: str, port: int) -> None:
+    workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+    max_requests = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+    options = dict(
+        host=host,
+        port=port,
+        factory=True,
+        # "auto" picks uvloop and httptools when they are installed
+        loop=os.getenv("SERVER_LOOP", "auto"),
+        http=os.getenv("SERVER_HTTP", "auto"),
+        log_level=os.getenv("SERVER_LOG_LEVEL", "info"),
+        access_log=os.getenv("SERVER_ACCESS_LOG", "0") == "1",
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+        limit_max_requests=max_requests or None,
+        timeout_graceful_shutdown=int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30")),
+        timeout_keep_alive=int(os.getenv("SERVER_KEEPALIVE", "5")),
+    )
+    # Only recent uvicorn releases spread recycling with a jitter
+    if "limit_max_requests_jitter" in inspect.signature(uvicorn.Config).parameters:
+        options["limit_max_requests_jitter"] = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "0"))
+    print(f"Production mode: {workers} workers, recycled after {max_requests or 'unlimited'} requests")
+    if hasattr(os, "fork"):
+        from langchain_react_agent.prefork import PreforkServer
+
+        PreforkServer(uvicorn.Config(APP, **options), workers).run()
+    else:
+        # No fork: uvicorn spawns the workers, each loading the app itself
+        uvicorn.run(APP, workers=workers, **options)
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
     host = os.getenv("HOST", "0.0.0.0")
-    
+    environment = os.getenv("ENVIRONMENT", "development")
+
     print(f"Starting server on {host}:{port}")
     print("Environment variables loaded:")
     print(f"OPENAI_API_KEY: {'configured' if os.getenv('OPENAI_API_KEY') else 'missing'}")
-    print(f"ENVIRONMENT: {os.getenv('ENVIRONMENT', 'development')}")
-    
-    uvicorn.run(
-        "langchain_react_agent.server:app",
-        host=host,
-        port=port,
-        reload=True,
-        log_level="info",
-        proxy_headers=True,
-        forwarded_allow_ips="*"
-    ) 
\ No newline at end of file
+    print(f"ENVIRONMENT: {environment}")
+
+    if environment == "production":
+        run_production(host, port)
+    else:
+        uvicorn.run(
+            APP,
+            factory=True,
+            host=host,
+            port=port,
+            reload=True,
+            log_level="info",
+            proxy_headers=True,
+            forwarded_allow_ips="*"
+        )
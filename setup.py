@@ -12,6 +12,9 @@ setup(
         "python-dotenv>=1.0.0",
         "openai>=1.0.0",
         "requests>=2.31.0",
+        "httpx>=0.24.0",
+        "langgraph-checkpoint-sqlite>=2.0.0",
+        "sse-starlette>=1.6.0",
     ],
     python_requires=">=3.9",
     author="Your Name",
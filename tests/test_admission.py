@@ -0,0 +1,174 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from langchain_react_agent.admission import AdmissionController, AdmissionMiddleware, AdmissionRejected, UpstreamRetry
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_admits_up_to_the_limit_without_waiting():
+    async def run():
+        controller = AdmissionController(max_in_flight=2, max_queue=4, queue_timeout=1)
+        await controller.acquire("a")
+        await controller.acquire("b")
+        assert controller.in_flight == 2
+        assert controller.queued == 0
+        controller.release()
+        controller.release()
+        assert controller.in_flight == 0
+        assert controller.admitted == 2
+
+    asyncio.run(run())
+
+
+def test_freed_slots_go_to_clients_in_turn():
+    async def run():
+        controller = AdmissionController(max_in_flight=1, max_queue=10, queue_timeout=5)
+        await controller.acquire("busy")
+        order = []
+
+        async def request(client, n):
+            await controller.acquire(client)
+            order.append(f"{client}{n}")
+
+        # One client bursts before the others show up
+        tasks = [asyncio.create_task(request("a", n)) for n in range(3)]
+        await settle()
+        tasks += [asyncio.create_task(request("b", 0)), asyncio.create_task(request("c", 0))]
+        await settle()
+        assert controller.stats()["clients_waiting"] == 3
+
+        for _ in range(5):
+            controller.release()
+            await settle()
+        await asyncio.gather(*tasks)
+        assert order == ["a0", "b0", "c0", "a1", "a2"]
+        # The last one still holds its slot
+        assert controller.in_flight == 1
+        assert controller.queued == 0
+
+    asyncio.run(run())
+
+
+def test_rejects_with_429_when_the_client_has_its_share_queued():
+    async def run():
+        controller = AdmissionController(max_in_flight=1, max_queue=10, queue_timeout=5, max_queue_per_client=2)
+        await controller.acquire("busy")
+        waiting = [asyncio.create_task(controller.acquire("a")) for _ in range(2)]
+        await settle()
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire("a")
+        assert excinfo.value.status_code == 429
+        assert excinfo.value.reason == "client_queue_full"
+        assert excinfo.value.retry_after >= 1
+        # Another client still gets in line
+        other = asyncio.create_task(controller.acquire("b"))
+        await settle()
+        assert controller.queued == 3
+        for task in waiting + [other]:
+            task.cancel()
+        await asyncio.gather(*waiting, other, return_exceptions=True)
+        assert controller.queued == 0
+        assert controller.rejected["client_queue_full"] == 1
+
+    asyncio.run(run())
+
+
+def test_rejects_with_503_when_the_queue_is_full():
+    async def run():
+        controller = AdmissionController(max_in_flight=1, max_queue=2, queue_timeout=5)
+        await controller.acquire("busy")
+        waiting = [asyncio.create_task(controller.acquire(client)) for client in ("a", "b")]
+        await settle()
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire("c")
+        assert (excinfo.value.status_code, excinfo.value.reason) == (503, "queue_full")
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+
+    asyncio.run(run())
+
+
+def test_rejects_with_503_when_the_wait_times_out():
+    async def run():
+        controller = AdmissionController(max_in_flight=1, max_queue=2, queue_timeout=0.05)
+        await controller.acquire("busy")
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire("a")
+        assert (excinfo.value.status_code, excinfo.value.reason) == (503, "queue_timeout")
+        assert controller.queued == 0
+        assert controller.stats()["clients_waiting"] == 0
+        # The timed-out waiter doesn't swallow the next free slot
+        controller.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_middleware_answers_429_and_503_with_retry_after():
+    async def run():
+        started = asyncio.Event()
+        finish = asyncio.Event()
+
+        async def invoke(request):
+            started.set()
+            await finish.wait()
+            return JSONResponse({"output": "ok"})
+
+        async def health(request):
+            return JSONResponse({"status": "ok"})
+
+        controller = AdmissionController(max_in_flight=1, max_queue=2, queue_timeout=5, max_queue_per_client=1)
+        app = AdmissionMiddleware(
+            Starlette(routes=[Route("/agent/invoke", invoke, methods=["POST"]), Route("/health", health)]),
+            controller,
+        )
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            def post(client_id):
+                return client.post("/agent/invoke", headers={"X-Client-Id": client_id})
+
+            running = asyncio.create_task(post("a"))
+            await started.wait()
+            queued = asyncio.create_task(post("a"))
+            await settle()
+
+            rejected = await post("a")
+            assert rejected.status_code == 429
+            assert rejected.json()["reason"] == "client_queue_full"
+            assert int(rejected.headers["Retry-After"]) >= 1
+
+            other = asyncio.create_task(post("b"))
+            await settle()
+            full = await post("c")
+            assert full.status_code == 503
+            assert full.json()["reason"] == "queue_full"
+            assert "Retry-After" in full.headers
+
+            # Routes that don't start a run are never held back
+            assert (await client.get("/health")).status_code == 200
+
+            finish.set()
+            responses = await asyncio.gather(running, queued, other)
+            assert [r.status_code for r in responses] == [200, 200, 200]
+        assert controller.in_flight == 0
+        assert controller.admitted == 3
+
+    asyncio.run(run())
+
+
+def test_upstream_retry_gives_up_after_max_retries():
+    retry = UpstreamRetry(max_retries=2, base=0.1, cap=1.0)
+    assert 0 <= retry.next_delay(0) <= 0.1
+    assert retry.next_delay(1, retry_after=0.5) >= 0.5
+    assert retry.next_delay(2) is None
+    assert retry.stats() == {"max_retries": 2, "retries": 2, "exhausted": 1}
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from langchain_react_agent.checkpoint import ThreadCheckpointer
+
+
+def echo(state: MessagesState):
+    return {"messages": [AIMessage(f"seen {len(state['messages'])}")]}
+
+
+def make_graph(checkpointer):
+    builder = StateGraph(MessagesState)
+    builder.add_node("echo", echo)
+    builder.add_edge(START, "echo")
+    builder.add_edge("echo", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+@pytest.fixture
+def checkpointer(tmp_path):
+    saver = ThreadCheckpointer(str(tmp_path / "threads.sqlite"), sweep_interval=3600)
+    yield saver
+    saver.close()
+
+
+def turn(graph, thread_id, text="hi"):
+    return graph.invoke({"messages": [HumanMessage(text)]}, config(thread_id))["messages"]
+
+
+def age(checkpointer, thread_id, seconds):
+    with checkpointer.cursor() as cur:
+        cur.execute("UPDATE thread_activity SET last_seen = last_seen - ? WHERE thread_id = ?", (seconds, thread_id))
+
+
+def test_threads_resume_from_the_cache(checkpointer):
+    graph = make_graph(checkpointer)
+    assert len(turn(graph, "a")) == 2
+    messages = turn(graph, "a")
+    assert len(messages) == 4
+    assert messages[-1].content == "seen 3"
+    stats = checkpointer.stats()
+    assert stats["threads"] == 1
+    assert stats["cache_hits"] >= 1
+
+
+def test_delete_thread_drops_state_and_cache(checkpointer):
+    graph = make_graph(checkpointer)
+    turn(graph, "a")
+    turn(graph, "b")
+    checkpointer.delete_thread("a")
+    assert checkpointer.get_tuple(config("a")) is None
+    assert checkpointer.stats()["threads"] == 1
+    # A deleted thread starts over
+    assert len(turn(graph, "a")) == 2
+    assert len(turn(graph, "b")) == 4
+
+
+def test_adelete_thread(checkpointer):
+    graph = make_graph(checkpointer)
+    turn(graph, "a")
+    asyncio.run(checkpointer.adelete_thread("a"))
+    assert checkpointer.get_tuple(config("a")) is None
+    assert checkpointer.stats()["threads"] == 0
+
+
+def test_expire_deletes_only_idle_threads(checkpointer):
+    graph = make_graph(checkpointer)
+    turn(graph, "idle")
+    turn(graph, "active")
+    age(checkpointer, "idle", checkpointer.ttl + 60)
+    assert checkpointer.expire() == 1
+    assert checkpointer.get_tuple(config("idle")) is None
+    assert checkpointer.get_tuple(config("active")) is not None
+    assert checkpointer.expire() == 0
+
+
+def test_turns_keep_a_thread_alive(checkpointer):
+    graph = make_graph(checkpointer)
+    turn(graph, "a")
+    age(checkpointer, "a", checkpointer.ttl + 60)
+    turn(graph, "a")
+    assert checkpointer.expire() == 0
+    assert len(turn(graph, "a")) == 6
+
+
+def test_reads_sweep_expired_threads(tmp_path):
+    checkpointer = ThreadCheckpointer(str(tmp_path / "threads.sqlite"), sweep_interval=0)
+    graph = make_graph(checkpointer)
+    turn(graph, "a")
+    age(checkpointer, "a", checkpointer.ttl + 60)
+    assert checkpointer.get_tuple(config("a")) is None
+    assert checkpointer.stats()["threads"] == 0
+    checkpointer.close()
+
+
+def test_stale_cache_is_not_served_after_another_writer(tmp_path):
+    path = str(tmp_path / "threads.sqlite")
+    first, second = ThreadCheckpointer(path), ThreadCheckpointer(path)
+    turn(make_graph(first), "a")
+    # Another worker answers the next turn on the same database
+    turn(make_graph(second), "a")
+    assert len(turn(make_graph(first), "a")) == 6
+    first.close()
+    second.close()
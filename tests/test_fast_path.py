@@ -0,0 +1,79 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from langchain_react_agent import fast_path
+from langchain_react_agent.container_data import ContainerType
+from langchain_react_agent.fast_path import Fallback, answer, parse, try_answer
+
+
+@pytest.mark.parametrize("text, origin, destination, counts", [
+    ("DE-HAM to US-NYC, 3 HH42, 1 HH12", "DE-HAM", "US-NYC", {"HH42": 3, "HH12": 1}),
+    ("Book from DE-HAM to US-NYC: HH42: 3, HH12 x 1", "DE-HAM", "US-NYC", {"HH42": 3, "HH12": 1}),
+    ("Please book 2x HH42 and HH24=1 from DE-HAM to US-NYC, thanks", "DE-HAM", "US-NYC", {"HH42": 2, "HH24": 1}),
+    ("to US-NYC from DE-HAM, 999 hh42", "DE-HAM", "US-NYC", {"HH42": 999}),
+    ("DEHAM to USNYC, 4 HH42", "DE-HAM", "US-NYC", {"HH42": 4}),
+])
+def test_parse_accepts(text, origin, destination, counts):
+    booking = parse(text)
+    assert (booking.origin, booking.destination) == (origin, destination)
+    assert {c.type.value: c.count for c in booking.containers} == counts
+
+
+@pytest.mark.parametrize("text, reason", [
+    ("DE-HAM to US-NYC, -1 HH42", "container_count"),
+    ("DE-HAM to US-NYC, 2.5 HH42", "container_count"),
+    ("DE-HAM to US-NYC, 1,000 HH42", "container_count"),
+    ("DE-HAM to US-NYC, 0 HH42", "container_count"),
+    ("DE-HAM to US-NYC, 1000 HH42", "container_count"),
+    ("DE-HAM to US-NYC, 12345678901234567890 HH42", "container_count"),
+    ("DE-HAM to US-NYC, 12 HH42 x 3", "container_repeated"),
+    ("DE-HAM to US-NYC, 2 HH42 and 3 HH42", "container_repeated"),
+    ("DE-HAM to US-NYC", "container_missing"),
+    ("DE-HAM to US-NYC, 2 HH42 and some HH12", "container_ambiguous"),
+    ("Not DE-HAM to US-NYC, 3 HH42. Please cancel.", "intent"),
+    ("Can I ship DE-HAM to US-NYC, 3 HH42?", "intent"),
+    ("DE-HAM to US-NYC, 3 HH42, don't book it", "intent"),
+    ("Ship 3 HH42 to US-NYC", "port_count"),
+    ("DE-HAM to US-NYC via GB-LON, 3 HH42", "port_count"),
+    ("From DE-HAM to DE-HAM, 3 HH42", "port_count"),
+    ("to US-NYC and to DE-HAM, 3 HH42", "port_direction"),
+])
+def test_parse_falls_back(text, reason):
+    with pytest.raises(Fallback) as excinfo:
+        parse(text)
+    assert str(excinfo.value) == reason
+
+
+def test_answer_validates_the_booking():
+    reply = answer("DE-HAM to US-NYC, 3 HH42, 1 HH12")
+    assert reply.startswith("Your booking is valid: origin DE-HAM (Hamburg, Germany) and destination US-NYC")
+    assert "3 x HH42" in reply and "1 x HH12" in reply
+
+
+def test_answer_rejects_same_country():
+    assert "are in the same country" in answer("US-NYC to US-LAX, 3 HH42")
+
+
+def test_answer_falls_back_on_unknown_port():
+    with pytest.raises(Fallback) as excinfo:
+        answer("XX-AAA to US-NYC, 3 HH42")
+    assert str(excinfo.value) == "port_unknown"
+
+
+def test_try_answer_records_stats(monkeypatch):
+    stats = fast_path.FastPathStats()
+    monkeypatch.setattr(fast_path, "stats", stats)
+
+    reply = try_answer([HumanMessage("DE-HAM to US-NYC, 3 HH42")])
+    assert isinstance(reply, AIMessage) and reply.additional_kwargs == {"fast_path": True}
+    assert try_answer([HumanMessage("Which ports are in Germany?")]) is None
+    assert try_answer([HumanMessage([{"type": "text", "text": "DE-HAM to US-NYC, 3 HH42"}])]) is None
+    assert try_answer([AIMessage("DE-HAM to US-NYC, 3 HH42")]) is None
+    assert try_answer([]) is None
+
+    assert stats.snapshot() == {
+        "turns": 3,
+        "fast_path": 1,
+        "fast_path_ratio": 1 / 3,
+        "fallbacks": {"intent": 1, "non_text": 1},
+    }
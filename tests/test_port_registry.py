@@ -0,0 +1,73 @@
+from langchain_react_agent.country_data import CountryEntry, entries
+from langchain_react_agent.port_registry import PortRegistry
+
+
+def make_registry() -> PortRegistry:
+    return PortRegistry(entries)
+
+
+def test_get_and_contains():
+    registry = make_registry()
+    assert registry.get("DE-HAM").name == "Hamburg"
+    assert registry.get("XX-XXX") is None
+    assert "US-NYC" in registry
+    assert len(registry) == len(entries)
+
+
+def test_by_country_is_case_insensitive():
+    registry = make_registry()
+    assert [e.id for e in registry.by_country("usa")] == ["US-NYC", "US-LAX"]
+    assert registry.by_country("Nowhere") == []
+
+
+def test_same_country():
+    registry = make_registry()
+    assert registry.same_country("US-NYC", "US-LAX") is True
+    assert registry.same_country("US-NYC", "GB-LON") is False
+    assert registry.same_country("US-NYC", "XX-XXX") is None
+
+
+def test_search_keeps_insertion_order():
+    registry = make_registry()
+    assert [e.id for e in registry.search("hamburg")] == ["DE-HAM", "DE-HRB"]
+    assert [e.id for e in registry.search("ERMAN")] == ["DE-HAM", "DE-HRB"]
+    assert registry.search("atlantis") == []
+
+
+def test_rank_orders_by_score_then_position():
+    registry = make_registry()
+    total, results = registry.rank("Hamburg", limit=10)
+    assert total == 2
+    assert [r.entry.id for r in results] == ["DE-HAM", "DE-HRB"]
+    assert results[0].score == results[1].score == 1.0
+
+
+def test_rank_tolerates_typos():
+    registry = make_registry()
+    total, results = registry.rank("Hamburk", limit=10)
+    assert total >= 2
+    assert {r.entry.id for r in results[:2]} == {"DE-HAM", "DE-HRB"}
+
+
+def test_rank_pages():
+    registry = make_registry()
+    total, first = registry.rank("Hamburg", limit=1)
+    _, second = registry.rank("Hamburg", limit=1, offset=1)
+    assert total == 2
+    assert [r.entry.id for r in first + second] == ["DE-HAM", "DE-HRB"]
+    assert registry.rank("Hamburg", limit=1, offset=2) == (2, [])
+    assert registry.rank("", limit=10) == (0, [])
+
+
+def test_add_and_remove_update_the_indexes():
+    registry = make_registry()
+    registry.add(CountryEntry(id="NL-RTM", name="Rotterdam", country="Netherlands"))
+    assert registry.get("NL-RTM").name == "Rotterdam"
+    assert [e.id for e in registry.search("rotter")] == ["NL-RTM"]
+    assert registry.rank("Roterdam", limit=10)[1][0].entry.id == "NL-RTM"
+
+    assert registry.remove("NL-RTM").id == "NL-RTM"
+    assert registry.remove("NL-RTM") is None
+    assert "NL-RTM" not in registry
+    assert registry.search("rotter") == []
+    assert registry.rank("Rotterdam", limit=10) == (0, [])
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from benchmarks.synthetic import make_entries
+from langchain_react_agent.country_data import CountryEntry
+from langchain_react_agent.port_registry import PortRegistry
+from langchain_react_agent.port_store import PortSnapshot, SnapshotRegistry, write_snapshot
+
+ENTRIES = make_entries(2000)
+QUERIES = ["Country BB", "countyr bb", "BB-0001", "ab", "zzzz", "Country"]
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return PortRegistry(ENTRIES)
+
+
+@pytest.fixture(scope="module")
+def snapshot(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("ports") / "ports.snapshot")
+    assert write_snapshot(ENTRIES, path) == len(ENTRIES)
+    return PortSnapshot(path, CountryEntry)
+
+
+def test_lookups_match(registry, snapshot):
+    assert len(snapshot) == len(registry)
+    assert [e.id for e in snapshot.entries()] == [e.id for e in registry.entries()]
+    for entry in ENTRIES[::97]:
+        assert snapshot.get(entry.id) == entry
+        assert entry.id in snapshot
+    assert snapshot.get("XX-XXX") is None
+    assert snapshot.same_country(ENTRIES[0].id, ENTRIES[1].id) == registry.same_country(ENTRIES[0].id, ENTRIES[1].id)
+    assert snapshot.same_country(ENTRIES[0].id, "XX-XXX") is None
+    country = ENTRIES[0].country
+    assert snapshot.by_country(country.upper()) == registry.by_country(country.upper())
+
+
+@pytest.mark.parametrize("query", QUERIES + [ENTRIES[123].name, ENTRIES[456].name[:-1]])
+def test_search_matches(registry, snapshot, query):
+    assert snapshot.search(query) == registry.search(query)
+
+
+@pytest.mark.parametrize("query", QUERIES + [ENTRIES[123].name, ENTRIES[456].name[:-1]])
+@pytest.mark.parametrize("limit, offset", [(10, 0), (5, 5), (100, 0), (10, 5000)])
+def test_rank_matches(registry, snapshot, query, limit, offset):
+    assert snapshot.rank(query, limit, offset) == registry.rank(query, limit, offset)
+
+
+def test_snapshot_registry_switches_on_publish(tmp_path):
+    path = str(tmp_path / "ports.snapshot")
+    write_snapshot(ENTRIES[:10], path)
+    registry = SnapshotRegistry(path, CountryEntry, check_interval=0)
+    reloads = []
+    registry.subscribe(lambda: reloads.append(True))
+    assert len(registry) == 10
+    old = registry.snapshot
+
+    assert registry.publish(ENTRIES[:20]) == 20
+    assert reloads == [True]
+    assert len(registry) == 20
+    assert registry.get(ENTRIES[15].id) == ENTRIES[15]
+    assert registry.rank(ENTRIES[15].name, 10) == PortRegistry(ENTRIES[:20]).rank(ENTRIES[15].name, 10)
+    # Readers holding the old snapshot keep their view
+    assert len(old) == 10
+    assert registry.reload() is False
+
+
+def test_snapshot_registry_keeps_serving_when_file_is_gone(tmp_path):
+    path = str(tmp_path / "ports.snapshot")
+    write_snapshot(ENTRIES[:10], path)
+    registry = SnapshotRegistry(path, CountryEntry, check_interval=0)
+    os.remove(path)
+    assert registry.reload() is False
+    assert registry.get(ENTRIES[3].id) == ENTRIES[3]
@@ -0,0 +1,108 @@
+"""Entry point script for validating booking exports offline.
+
+Reads a CSV or NDJSON export of bookings (origin, destination and
+containers per row), applies the port and container rules on a process
+pool and writes one NDJSON result per row:
+
+    python validate_bookings.py bookings.csv -o results.ndjson
+    python validate_bookings.py bookings.csv -o results.ndjson --resume
+
+Progress is recorded in <output>.checkpoint after every chunk; --resume
+continues after the last row written.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv(override=True)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Validate booking exports against the port and container rules.")
+    parser.add_argument("input", help="CSV or NDJSON file with origin, destination and containers per row")
+    parser.add_argument("-o", "--output", required=True, help="NDJSON file the results are written to")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="input format (default: from the file extension)")
+    parser.add_argument("--ports", help="CSV port dataset (default: PORT_DATA_FILE or the built-in ports)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes, 0 runs inline")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="rows per unit of work")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint next to the output")
+    parser.add_argument("--offset", type=int, help="start at this row offset, appending to the output")
+    return parser.parse_args()
+
+
+def read_checkpoint(path: str) -> dict:
+    """Row offset to resume from and the output size that goes with it."""
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {"offset": 0, "position": 0}
+
+
+def write_checkpoint(path: str, offset: int, position: int) -> None:
+    # Replace atomically so an interrupted run never leaves a torn checkpoint
+    with open(path + ".tmp", "w", encoding="utf-8") as handle:
+        json.dump({"offset": offset, "position": position}, handle)
+    os.replace(path + ".tmp", path)
+
+
+def main() -> int:
+    args = parse_args()
+    if args.ports:
+        # Read when the registry is built, in this process and in the workers
+        os.environ["PORT_DATA_FILE"] = args.ports
+    from langchain_react_agent.bookings import read_rows, run
+
+    fmt = args.format or ("ndjson" if args.input.endswith((".ndjson", ".jsonl")) else "csv")
+    checkpoint = args.output + ".checkpoint"
+    start, position = 0, 0
+    if args.offset is not None:
+        start = args.offset
+    elif args.resume:
+        state = read_checkpoint(checkpoint)
+        start, position = state["offset"], state["position"]
+
+    started = time.perf_counter()
+    last_report = started
+
+    def on_chunk(offset: int, rows: int, invalid: int) -> None:
+        nonlocal last_report
+        write_checkpoint(checkpoint, offset, output.tell())
+        now = time.perf_counter()
+        if now - last_report >= 1.0:
+            last_report = now
+            done = offset - start
+            print(f"{offset} rows ({done / (now - started):.0f} rows/s)", file=sys.stderr)
+
+    print(f"Validating {args.input} from row {start} with {args.workers} workers", file=sys.stderr)
+    with open(args.input, newline="", encoding="utf-8") as source, \
+            open(args.output, "a" if start else "w", encoding="utf-8") as output:
+        if args.resume and output.tell() > position:
+            # Drop results written after the last checkpoint; they are redone
+            output.truncate(position)
+        counts = run(
+            read_rows(source, fmt),
+            output,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            start=start,
+            on_chunk=on_chunk,
+        )
+
+    elapsed = time.perf_counter() - started
+    rate = counts["rows"] / elapsed if elapsed else 0.0
+    print(
+        f"Done: {counts['rows']} rows, {counts['invalid']} invalid, "
+        f"{elapsed:.1f}s, {rate:.0f} rows/s",
+        file=sys.stderr,
+    )
+    return 1 if counts["invalid"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())